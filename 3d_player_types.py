@@ -1,139 +1,204 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from sklearn.cluster import KMeans, DBSCAN
-from sklearn.preprocessing import StandardScaler
 
-st.title("🎮 Player Event Metric Visualizer (3D Scatter + Clustering)")
-
-uploaded_file = st.file_uploader("Upload CSV with columns: key.0 (distinct_id), key.1 (event_type), value", type="csv")
+from artifacts import export_source
+from data_loader import EVENT_COUNT_NAMES, EVENT_COUNT_SCHEMA, load_dataset
+from player_clustering import DBSCAN_MAX_EPS, KMEANS_K_RANGE, MINIBATCH_MIN_PLAYERS, dbscan_engine, kmeans_models
+from player_features import cached_projection, event_matrix, event_matrix_artifact, scaled_features
+from stage_timing import stage, start_page, timings_panel
 
-if uploaded_file:
-    # Read and rename columns
-    df = pd.read_csv(uploaded_file)
-    df.columns = ['distinct_id', 'event_type', 'count']
+PREVIEW_ROWS = 1000
 
-    # Pivot to player-level feature matrix
-    pivot_df = df.pivot_table(
-        index='distinct_id',
-        columns='event_type',
-        values='count',
-        fill_value=0
-    ).reset_index()
-
-    # Ensure required event types are present
-    for col in ["syncs_extracted", "weapon_used", "building_placed"]:
-        if col not in pivot_df.columns:
-            pivot_df[col] = 0
+st.title("🎮 Player Event Metric Visualizer (3D Scatter + Clustering)")
+start_page('3d_player_types')
+
+# Event counts: shared by another page or session, precomputed by
+# precompute.py, or uploaded here
+dataset_key, precomputed = export_source(
+    'events', "Upload CSV with columns: key.0 (distinct_id), key.1 (event_type), value", type="csv"
+)
+
+if dataset_key:
+    # Player-level feature matrix, kept sparse; only the selected features
+    # are densified
+    if precomputed:
+        with stage('load precomputed features') as s:
+            events = event_matrix_artifact(dataset_key)
+            s.rows_out = len(events.players)
+    else:
+        # Read columns by position under fixed names
+        with stage('read_csv: event counts') as s:
+            df = s.rows_out = load_dataset(dataset_key, EVENT_COUNT_SCHEMA, names=EVENT_COUNT_NAMES)
+        with stage('pivot: player features', df) as s:
+            events = event_matrix(df, dataset_key)
+            s.rows_out = len(events.players)
+
+    # Live pivots and artifacts order players differently, so caches over the
+    # feature matrix are keyed on where it came from
+    matrix_key = (dataset_key, 'artifact' if precomputed else 'live')
 
     st.markdown("### 📋 Preview of Aggregated Player Metrics")
-    st.dataframe(pivot_df, use_container_width=True)
+    if len(events.players) > PREVIEW_ROWS:
+        st.caption(f"First {PREVIEW_ROWS:,} of {len(events.players):,} players ({len(events.event_types):,} event types, {events.nnz:,} non-zero values)")
+    st.dataframe(events.preview(PREVIEW_ROWS), use_container_width=True)
 
     # ================================
     # 🔄 Shared Features + Scaling
     # ================================
-    features = pivot_df[["weapon_used", "syncs_extracted", "building_placed"]]
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(features)
+    cluster_features = st.multiselect(
+        "🧩 Clustering features (event types)", list(events.event_types), default=events.default_features()
+    )
+    if not cluster_features:
+        st.info("Select at least one event type to cluster on.")
+        st.stop()
+
+    # Standard-scaled in row batches into a float32 array, cached per feature set
+    with stage('scale features', len(events.players)) as s:
+        X_scaled = s.rows_out = scaled_features(events, matrix_key, tuple(cluster_features))
+    feature_key = (matrix_key, tuple(cluster_features))
+    players_df = pd.DataFrame({"distinct_id": np.asarray(events.players, dtype=object)})
+
+    # 3D view: up to three features are plotted as-is; more are projected onto
+    # their first three principal components (IncrementalPCA, fitted in batches)
+    if len(cluster_features) > 3 and len(X_scaled) >= 3:
+        with stage('PCA projection', X_scaled) as s:
+            coords, explained = cached_projection(X_scaled, feature_key)
+            s.rows_out = coords
+        axis_titles = [f"PC{i + 1} ({ratio:.0%} var)" for i, ratio in enumerate(explained)]
+        st.caption(f"3D views show the first three principal components of {len(cluster_features)} scaled features")
+    else:
+        coords = events.columns(cluster_features)
+        axis_titles = list(cluster_features)
+        if len(cluster_features) < 3:
+            coords = np.column_stack([coords, np.zeros((len(coords), 3 - len(cluster_features)))])
+            axis_titles += [""] * (3 - len(cluster_features))
+    hover_axes = "".join(f"<br>{title}: %{{{axis}}}" for title, axis in zip(axis_titles, "xyz") if title)
+
+    def cluster_summary(labels, label_column):
+        """Players and average raw feature values per cluster."""
+        clusters, sizes, means = events.group_means(labels, cluster_features)
+        summary = pd.DataFrame({label_column: clusters, "Players": sizes})
+        for i, feature in enumerate(cluster_features):
+            summary["Avg_" + "_".join(word.capitalize() for word in feature.split("_"))] = means[:, i]
+        return summary
+
+    def cluster_figure(labels, colorscale, cluster_name, title):
+        fig = go.Figure(data=[go.Scatter3d(
+            x=coords[:, 0],
+            y=coords[:, 1],
+            z=coords[:, 2],
+            mode='markers',
+            marker=dict(
+                size=6,
+                color=labels,
+                colorscale=colorscale,
+                opacity=0.9,
+                colorbar=dict(title=cluster_name)
+            ),
+            text=players_df["distinct_id"],
+            hovertemplate=f'<b>%{{text}}</b>{hover_axes}<br>{cluster_name}: %{{marker.color}}<extra></extra>'
+        )])
+
+        fig.update_layout(
+            scene=dict(
+                xaxis_title=axis_titles[0],
+                yaxis_title=axis_titles[1],
+                zaxis_title=axis_titles[2],
+            ),
+            title=title,
+            margin=dict(l=0, r=0, b=0, t=30)
+        )
+        return fig
 
     # ================================
     # 🚀 KMeans Clustering
     # ================================
-    st.subheader("📌 KMeans Clustering")
-    num_clusters = st.slider("🔢 Number of KMeans Clusters", min_value=2, max_value=10, value=4)
-
-    kmeans = KMeans(n_clusters=num_clusters, random_state=42)
-    pivot_df["kmeans_cluster"] = kmeans.fit_predict(X_scaled)
-
-    # --- 3D Plot for KMeans
-    fig_kmeans = go.Figure(data=[go.Scatter3d(
-        x=pivot_df["weapon_used"],
-        y=pivot_df["syncs_extracted"],
-        z=pivot_df["building_placed"],
-        mode='markers',
-        marker=dict(
-            size=6,
-            color=pivot_df["kmeans_cluster"],
-            colorscale='Viridis',
-            opacity=0.9,
-            colorbar=dict(title="KMeans Cluster")
-        ),
-        text=pivot_df["distinct_id"],
-        hovertemplate='<b>%{text}</b><br>weapon_used: %{x}<br>syncs_extracted: %{y}<br>building_placed: %{z}<br>KMeans Cluster: %{marker.color}<extra></extra>'
-    )])
-
-    fig_kmeans.update_layout(
-        scene=dict(
-            xaxis_title='weapon_used',
-            yaxis_title='syncs_extracted',
-            zaxis_title='building_placed',
-        ),
-        title="🔍 KMeans Clustered Player Activity Map (3D)",
-        margin=dict(l=0, r=0, b=0, t=30)
-    )
-
-    st.plotly_chart(fig_kmeans, use_container_width=True)
-
-    # --- KMeans Cluster Summary
-    st.markdown("### 📊 KMeans Cluster Summary")
-    kmeans_summary = pivot_df.groupby("kmeans_cluster").agg(
-        Players=("distinct_id", "count"),
-        Avg_Weapon_Used=("weapon_used", "mean"),
-        Avg_Syncs_Extracted=("syncs_extracted", "mean"),
-        Avg_Building_Placed=("building_placed", "mean")
-    ).reset_index()
-
-    st.dataframe(kmeans_summary)
+    # Each clustering section is a fragment over the scaled features: its
+    # widgets only recluster and redraw that section
+    st.sidebar.markdown("### 🚀 KMeans Parameters")
+    use_minibatch = st.sidebar.checkbox("Use MiniBatchKMeans (large inputs)", value=len(players_df) >= MINIBATCH_MIN_PLAYERS)
+
+    @st.fragment
+    def kmeans_section(X_scaled, feature_key, use_minibatch):
+        st.subheader("📌 KMeans Clustering")
+        num_clusters = st.slider("🔢 Number of KMeans Clusters", min_value=2, max_value=10, value=4)
+
+        # Fits are cached per (features, k); the requested k is fitted right
+        # away and the rest of the k range in the background
+        kmeans = kmeans_models(feature_key)
+        with stage('KMeans', X_scaled) as s:
+            kmeans_fit = kmeans.fit(X_scaled, num_clusters, use_minibatch)
+            s.rows_out = kmeans_fit.labels
+        kmeans.sweep(X_scaled, use_minibatch)
+
+        # --- 3D Plot for KMeans
+        fig_kmeans = cluster_figure(
+            kmeans_fit.labels, 'Viridis', "KMeans Cluster", "🔍 KMeans Clustered Player Activity Map (3D)"
+        )
+        with stage('plotly: KMeans map', X_scaled):
+            st.plotly_chart(fig_kmeans, use_container_width=True)
+
+        # --- KMeans Cluster Summary
+        st.markdown("### 📊 KMeans Cluster Summary")
+        with stage('KMeans summary', X_scaled) as s:
+            kmeans_summary = s.rows_out = cluster_summary(kmeans_fit.labels, "kmeans_cluster")
+
+        st.dataframe(kmeans_summary)
+
+        # --- Choosing k: inertia (elbow) and silhouette over the background sweep
+        st.markdown("### 📈 Choosing k")
+        finished, total = kmeans.progress(use_minibatch)
+        if finished < total:
+            st.caption(f"k-sweep running in the background: {finished}/{total} fits done (curves update on the next rerun)")
+        curves = kmeans.curves(use_minibatch)
+        if not curves.empty:
+            inertia_col, silhouette_col = st.columns(2)
+            for column, metric in [(inertia_col, "Inertia"), (silhouette_col, "Silhouette")]:
+                fig_curve = go.Figure(data=[go.Scatter(x=curves["k"], y=curves[metric], mode='lines+markers')])
+                fig_curve.update_layout(
+                    title=f"{metric} by k",
+                    xaxis=dict(title="k", dtick=1, range=[KMEANS_K_RANGE[0] - 0.5, KMEANS_K_RANGE[-1] + 0.5]),
+                    yaxis_title=metric,
+                    margin=dict(l=0, r=0, b=0, t=30)
+                )
+                column.plotly_chart(fig_curve, use_container_width=True)
+
+    kmeans_section(X_scaled, feature_key, use_minibatch)
 
     # ================================
     # 🔍 DBSCAN Clustering (Separate Graph)
     # ================================
-    st.subheader("📌 DBSCAN Clustering")
-
-    st.sidebar.markdown("### ⚙️ DBSCAN Parameters")
-    eps = st.sidebar.slider("DBSCAN eps (neighborhood size)", min_value=0.1, max_value=5.0, value=1.2, step=0.1)
-    min_samples = st.sidebar.slider("DBSCAN min_samples", min_value=1, max_value=10, value=5, step=1)
-
-    dbscan = DBSCAN(eps=eps, min_samples=min_samples)
-    pivot_df["dbscan_cluster"] = dbscan.fit_predict(X_scaled)
-
-    # --- 3D Plot for DBSCAN
-    fig_dbscan = go.Figure(data=[go.Scatter3d(
-        x=pivot_df["weapon_used"],
-        y=pivot_df["syncs_extracted"],
-        z=pivot_df["building_placed"],
-        mode='markers',
-        marker=dict(
-            size=6,
-            color=pivot_df["dbscan_cluster"],
-            colorscale='Plasma',
-            opacity=0.9,
-            colorbar=dict(title="DBSCAN Cluster")
-        ),
-        text=pivot_df["distinct_id"],
-        hovertemplate='<b>%{text}</b><br>weapon_used: %{x}<br>syncs_extracted: %{y}<br>building_placed: %{z}<br>DBSCAN Cluster: %{marker.color}<extra></extra>'
-    )])
-
-    fig_dbscan.update_layout(
-        scene=dict(
-            xaxis_title='weapon_used',
-            yaxis_title='syncs_extracted',
-            zaxis_title='building_placed',
-        ),
-        title="🧬 DBSCAN Clustered Player Activity Map (3D)",
-        margin=dict(l=0, r=0, b=0, t=30)
-    )
-
-    st.plotly_chart(fig_dbscan, use_container_width=True)
-
-    # --- DBSCAN Cluster Summary
-    st.markdown("### 📊 DBSCAN Cluster Summary (includes noise: -1)")
-    dbscan_summary = pivot_df.groupby("dbscan_cluster").agg(
-        Players=("distinct_id", "count"),
-        Avg_Weapon_Used=("weapon_used", "mean"),
-        Avg_Syncs_Extracted=("syncs_extracted", "mean"),
-        Avg_Building_Placed=("building_placed", "mean")
-    ).reset_index()
-
-    st.dataframe(dbscan_summary)
-
+    @st.fragment
+    def dbscan_section(X_scaled, feature_key):
+        st.subheader("📌 DBSCAN Clustering")
+
+        # Fragments cannot write to the sidebar, so the parameters sit above the map
+        eps_col, min_samples_col = st.columns(2)
+        eps = eps_col.slider("DBSCAN eps (neighborhood size)", min_value=0.1, max_value=DBSCAN_MAX_EPS, value=1.2, step=0.1)
+        min_samples = min_samples_col.slider("DBSCAN min_samples", min_value=1, max_value=10, value=5, step=1)
+
+        # Labels are cached per (eps, min_samples) for this feature matrix;
+        # wide matrices also reuse one neighbor graph across slider moves
+        with stage('DBSCAN', X_scaled) as s:
+            dbscan = dbscan_engine(X_scaled, feature_key)
+            dbscan_labels = s.rows_out = dbscan.labels(eps, min_samples)
+
+        # --- 3D Plot for DBSCAN
+        fig_dbscan = cluster_figure(
+            dbscan_labels, 'Plasma', "DBSCAN Cluster", "🧬 DBSCAN Clustered Player Activity Map (3D)"
+        )
+        with stage('plotly: DBSCAN map', X_scaled):
+            st.plotly_chart(fig_dbscan, use_container_width=True)
+
+        # --- DBSCAN Cluster Summary
+        st.markdown("### 📊 DBSCAN Cluster Summary (includes noise: -1)")
+        with stage('DBSCAN summary', X_scaled) as s:
+            dbscan_summary = s.rows_out = cluster_summary(dbscan_labels, "dbscan_cluster")
+
+        st.dataframe(dbscan_summary)
+
+    dbscan_section(X_scaled, feature_key)
+
+timings_panel()
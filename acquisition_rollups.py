@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from artifacts import artifact_path
+from blueprint_ownership import knowledge_columns
+from data_loader import SIDECAR_DIR
+
+# ==============================
+# 📈 Daily acquisition rollups
+# ==============================
+# A local store of when each player first acquired each blueprint, plus the
+# number of first acquisitions per (day, blueprint). Uploading an export merges
+# it into the store: only (player, blueprint) pairs that are new or were
+# acquired earlier than previously recorded change, and the daily counts are
+# adjusted by exactly those changes, so earlier days are never recomputed. An
+# export is only merged once (keyed on its content hash).
+
+ROLLUP_DIR = os.environ.get('SHOP_ROLLUP_DIR', os.path.join(SIDECAR_DIR, 'shop_rollups'))
+
+KEYS = ['distinct_id', 'Blueprint']
+
+
+def first_acquisitions(df, time_column='time'):
+    """Earliest day each player was granted each blueprint in ``df``, whose
+    ``time_column`` holds Mixpanel epoch milliseconds."""
+    players = df['distinct_id'].astype('category')
+    player_codes = players.cat.codes.to_numpy()
+    # Only this column is converted; the shared frame is never copied
+    days = pd.to_datetime(df[time_column], unit='ms').dt.floor('D').to_numpy()
+
+    parts = []
+    for col in knowledge_columns(df):
+        values = df[col].astype('category')
+        codes = values.cat.codes.to_numpy()
+        present = (codes >= 0) & (player_codes >= 0) & ~pd.isna(days)
+        parts.append(pd.DataFrame({
+            'player': player_codes[present],
+            'Blueprint': pd.Categorical.from_codes(codes[present], values.cat.categories).astype(object),
+            'day': days[present],
+        }))
+    if not parts:
+        return pd.DataFrame({'distinct_id': [], 'Blueprint': [], 'day': pd.to_datetime([])})
+
+    grants = pd.concat(parts, ignore_index=True)
+    firsts = grants.groupby(['player', 'Blueprint'], sort=False)['day'].min().reset_index()
+    firsts.insert(0, 'distinct_id', np.asarray(players.cat.categories, dtype=object)[firsts.pop('player')])
+    return firsts
+
+
+def _daily_counts(firsts):
+    return firsts.groupby(['day', 'Blueprint']).size()
+
+
+class AcquisitionStore:
+    """First-acquisition dates and per-day counts, persisted under ``path``."""
+
+    def __init__(self, path=ROLLUP_DIR):
+        self.path = path
+        self.lock = threading.Lock()
+        self.firsts = self._read('first_acquisitions.parquet', pd.DataFrame({
+            'distinct_id': pd.Series([], dtype=object),
+            'Blueprint': pd.Series([], dtype=object),
+            'day': pd.Series([], dtype='datetime64[ns]'),
+        }))
+        daily = self._read('daily.parquet', None)
+        self.daily = (
+            daily.set_index(['day', 'Blueprint'])['New Players'] if daily is not None
+            else _daily_counts(self.firsts)
+        )
+        self.ingested = set()
+        if os.path.exists(self._file('ingested.json')):
+            with open(self._file('ingested.json')) as f:
+                self.ingested = set(json.load(f))
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read(self, name, default):
+        return pd.read_parquet(self._file(name)) if os.path.exists(self._file(name)) else default
+
+    def _write(self, name, write):
+        # Same write-then-rename as the CSV sidecars: readers never see a
+        # half-written file
+        tmp_path = f"{self._file(name)}.{os.getpid()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, self._file(name))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._write('first_acquisitions.parquet', lambda p: self.firsts.to_parquet(p, index=False))
+        daily = self.daily.rename('New Players').reset_index()
+        self._write('daily.parquet', lambda p: daily.to_parquet(p, index=False))
+        self._write('ingested.json', self._write_ingested)
+
+    def _write_ingested(self, path):
+        with open(path, 'w') as f:
+            json.dump(sorted(self.ingested), f)
+
+    def ingest(self, digest, df=None, firsts=None):
+        """Merge an export, or its precomputed ``first_acquisitions``, into the
+        store; returns the number of changed pairs (0 if this export was
+        merged before)."""
+        with self.lock:
+            if digest in self.ingested:
+                return 0
+
+            new = first_acquisitions(df) if firsts is None else firsts
+            joined = new.merge(self.firsts, on=KEYS, how='left', suffixes=('', '_old'))
+            changed = joined[joined['day_old'].isna() | (joined['day'] < joined['day_old'])]
+
+            # +1 on the new first day, -1 on the day it replaces
+            added = _daily_counts(changed)
+            removed = _daily_counts(changed.dropna(subset=['day_old']).drop(columns='day').rename(columns={'day_old': 'day'}))
+            daily = self.daily.add(added, fill_value=0).sub(removed, fill_value=0).astype('int64')
+            self.daily = daily[daily > 0].sort_index()
+
+            self.firsts = pd.concat([self.firsts, changed[KEYS + ['day']]], ignore_index=True).drop_duplicates(KEYS, keep='last')
+            self.ingested.add(digest)
+            self._save()
+            return len(changed)
+
+    def daily_acquisitions(self, items):
+        """New players per day for each of ``items``, one column per blueprint."""
+        with self.lock:
+            daily = self.daily
+        daily = daily[daily.index.get_level_values('Blueprint').isin(items)]
+        return daily.unstack('Blueprint', fill_value=0).sort_index()
+
+
+@st.cache_resource
+def acquisition_store(path=ROLLUP_DIR):
+    # One store per directory, shared by every session
+    return AcquisitionStore(path)
+
+
+# Written next to the ownership matrix in a shop artifact
+FIRSTS_FILE = 'first_acquisitions.parquet'
+
+
+@st.cache_resource(max_entries=8)
+def first_acquisitions_artifact(digest):
+    """Precomputed first acquisitions of an export, or None if it had no times."""
+    path = os.path.join(artifact_path('shop', digest), FIRSTS_FILE)
+    return pd.read_parquet(path) if os.path.exists(path) else None
@@ -2,20 +2,33 @@ import streamlit as st
 import plotly.express as px
 import numpy as np
 import pandas as pd
-import time
+
+from building_proximity import DEFAULT_PROXIMITY_RADIUS, cached_kills_within, proximity_index
+from artifacts import export_source
+from data_loader import BUILDING_SCHEMA, KILL_SCHEMA, load_dataset
+from kill_locations import (
+    ANIMATION_BUCKETS,
+    DEFAULT_VOXEL_RESOLUTION,
+    LOD_MIN_POINTS,
+    cached_animation_figure,
+    cached_voxels,
+    filter_index,
+    voxel_figure,
+)
+from stage_timing import stage, start_page, timings_panel
 
 # Streamlit app
 st.title("3D Scatter Plot Example")
+start_page('app')
 
-# CSV Upload Option
-uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
+# CSV Upload Option (or a kill export already shared by another page)
+dataset_key, _ = export_source('kill_locations', "Upload CSV file", type=["csv"])
 
-if uploaded_file is not None:
-    data = pd.read_csv(uploaded_file)
+if dataset_key is not None:
+    with stage('read_csv: kills') as s:
+        data = s.rows_out = load_dataset(dataset_key, KILL_SCHEMA)
     if {'properties.loc_x', 'properties.loc_y', 'properties.loc_z', 'properties.cause', 'properties.carriage_id', 'time'}.issubset(data.columns):
         st.success("CSV loaded successfully!")
-        # Convert Unix time to datetime format and round to the nearest minute
-        # data['time'] = pd.to_datetime(data['time'], unit='s').dt.floor('min')
     else:
         st.error("CSV must contain columns: loc_x, loc_y, loc_z, cause, carriage_id, and time (Unix format)")
         st.stop()
@@ -23,7 +36,10 @@ else:
     # Generate test data if no file is uploaded
     np.random.seed(42)
     n = 100  # Number of points
-   #  current_time = int(time.time())  # Current Unix time.timestamp
+    dataset_key = 'synthetic'
+    # A fixed start time: the synthetic data is cached under one key, so its
+    # timestamps (and animation frame labels) must not change between reruns
+    start_time = 1_700_000_000
     data = pd.DataFrame({
         'properties.loc_x': np.random.rand(n) * 10,
         'properties.loc_y': np.random.rand(n) * 10,
@@ -31,67 +47,89 @@ else:
         'properties.cause': np.random.choice(['A', 'B', 'C'], n),  # Random categories
         'properties.carriage_id': np.random.choice(['Car1', 'Car2', 'Car3'], n),  # Random carriage IDs
         'properties.server_id': np.random.choice(['server1', 'server2', 'server3'], n),
-        # 'time': np.random.randint(current_time, current_time + 3600, n)  # Random Unix timestamps in next hour
+        'time': np.random.randint(start_time, start_time + 3600, n)  # Random Unix timestamps within an hour
     })
-     #data['time'] = pd.to_datetime(data['time'], unit='s').dt.floor('min')  # Convert to datetime and round to minute
+
+# Per-value row lists for the three filters, built once per dataset
+with stage('filter index', data):
+    kill_filters = filter_index(data, dataset_key)
 
 # Streamlit selector for filtering cause
-cause_options = ['All'] + sorted(data['properties.cause'].unique().tolist())
+cause_options = ['All'] + kill_filters.values('properties.cause')
 selected_cause = st.selectbox("Select Cause to Display", cause_options)
 
 # Streamlit selector for filtering carriage_id
-carriage_options = ['All'] + sorted(data['properties.carriage_id'].unique().tolist())
-server_options = ['All'] + sorted(data['properties.server_id'].unique().tolist())
+carriage_options = ['All'] + kill_filters.values('properties.carriage_id')
+server_options = ['All'] + kill_filters.values('properties.server_id')
 selected_carriage = st.selectbox("Select Carriage ID to Display", carriage_options)
 selected_server= st.selectbox("Select Server to Display", server_options)
 
-# Filter data based on selections
-filtered_data = data
-if selected_cause != 'All':
-    filtered_data = filtered_data[filtered_data['properties.cause'] == selected_cause]
-if selected_carriage != 'All':
-    filtered_data = filtered_data[filtered_data['properties.carriage_id'] == selected_carriage]
-if selected_server != 'All':
-    filtered_data = filtered_data[filtered_data['properties.server_id'] == selected_server]
-
-# Ensure animation shows all kills up to the current time frame
-# filtered_data = filtered_data.sort_values(by='time')
-# cumulative_data = []
-# for t in filtered_data['time'].unique():
-#     subset = filtered_data[filtered_data['time'] <= t].copy()  # Apply filters to animated dataset as well
-#     subset['cumulative_time'] = t  # Assign same time for proper animation grouping
-#     cumulative_data.append(subset)
-# cumulative_data = pd.concat(cumulative_data)
-
-# Static 3D Scatter Plot
-fig_static = px.scatter_3d(
-    filtered_data, x='properties.loc_x', y='properties.loc_y', z='properties.loc_z',
-    color='properties.cause',  # Different colors for different causes
-    size_max=6,
-    title='3D Scatter Plot (Static)',
-    labels={'loc_x': 'X Axis', 'loc_y': 'Y Axis', 'loc_z': 'Z Axis', 'cause': 'Cause', 'carriage_id': 'Carriage ID'}
-)
-
-# Animated 3D Scatter Plot with Time Scrub
-# fig_animated = px.scatter_3d(
-#     cumulative_data, x='properties.loc_x', y='properties.loc_y', z='properties.loc_z',
-#     color='properties.cause',  # Different colors for different causes
-#     size_max=6,
-#     title='3D Scatter Plot with Cumulative Time Animation',
-#     labels={'loc_x': 'X Axis', 'loc_y': 'Y Axis', 'loc_z': 'Z Axis', 'cause': 'Cause', 'carriage_id': 'Carriage ID', 'cumulative_time': 'Time'},
-#     animation_frame='cumulative_time'  # Animate showing all points up to each time frame
-# )
+# Filter data based on selections: intersect row lists, then a single take()
+with stage('filter kills', data) as s:
+    filtered_data = s.rows_out = kill_filters.select(data, {
+        'properties.cause': selected_cause,
+        'properties.carriage_id': selected_carriage,
+        'properties.server_id': selected_server,
+    })
+kill_filter_key = (selected_cause, selected_carriage, selected_server)
+
+# The static scatter and the animation are fragments: their own widgets
+# only redraw that chart, not the rest of the page
+
+# Static 3D Scatter Plot; large selections are drawn as one marker per voxel
+@st.fragment
+def static_scatter(filtered_data, kill_filter_key):
+    if len(filtered_data) > LOD_MIN_POINTS:
+        # Fragments cannot write to the sidebar, so the controls sit above the plot
+        resolution_col, color_col = st.columns(2)
+        voxel_resolution = resolution_col.slider("Voxel resolution", min_value=16, max_value=128, value=DEFAULT_VOXEL_RESOLUTION, step=8)
+        voxel_color = color_col.radio("Color voxels by", ['Dominant Cause', 'Kills'], horizontal=True)
+        with stage('voxelize', filtered_data) as s:
+            voxels = s.rows_out = cached_voxels(filtered_data, dataset_key, kill_filter_key, voxel_resolution)
+        fig_static = voxel_figure(voxels, voxel_color, title='3D Scatter Plot (Static, Voxel LOD)')
+        st.caption(f"{len(filtered_data):,} kills drawn as {len(voxels):,} voxels")
+    else:
+        fig_static = px.scatter_3d(
+            filtered_data, x='properties.loc_x', y='properties.loc_y', z='properties.loc_z',
+            color='properties.cause',  # Different colors for different causes
+            size_max=6,
+            title='3D Scatter Plot (Static)',
+            labels={'loc_x': 'X Axis', 'loc_y': 'Y Axis', 'loc_z': 'Z Axis', 'cause': 'Cause', 'carriage_id': 'Carriage ID'}
+        )
+
+    # Display static plot
+    with stage('plotly: static scatter', filtered_data):
+        st.plotly_chart(fig_static)
+
+static_scatter(filtered_data, kill_filter_key)
+
+# Animated 3D Scatter Plot with Time Scrub: each frame shows all kills up to
+# its time bucket (as voxel counts past the LOD threshold); the figure is
+# built once per dataset, filter combination and frame size
+@st.fragment
+def time_animation(filtered_data, kill_filter_key):
+    show_animation = st.checkbox("Show cumulative time animation")
+    if not show_animation:
+        return
+    bucket = st.selectbox("Animation frame size", list(ANIMATION_BUCKETS), index=1)
+    with stage('animation figure', filtered_data) as s:
+        fig_animated = cached_animation_figure(filtered_data, dataset_key, kill_filter_key, ANIMATION_BUCKETS[bucket])
+        s.rows_out = len(fig_animated.frames) if fig_animated is not None else 0
+    if fig_animated is not None:
+        with stage('plotly: animation', filtered_data):
+            st.plotly_chart(fig_animated)
+    else:
+        st.info("No kills with a time in the current selection.")
 
-# Display both plots
-st.plotly_chart(fig_static)
-# st.plotly_chart(fig_animated)
+time_animation(filtered_data, kill_filter_key)
 
 # ---- Building Placement Visualization ----
 
 # CSV Upload Option for Buildings
-uploaded_building_file = st.file_uploader("Upload Buildings CSV file", type=["csv"], key="buildings")
-if uploaded_building_file is not None:
-    df_buildings = pd.read_csv(uploaded_building_file)
+buildings_key, _ = export_source('buildings', "Upload Buildings CSV file", type=["csv"], key="buildings")
+if buildings_key is not None:
+    with stage('read_csv: buildings') as s:
+        df_buildings = s.rows_out = load_dataset(buildings_key, BUILDING_SCHEMA)
     if {'properties.building_id', 'properties.loc_x', 'properties.loc_y', 'properties.loc_z', 'properties.carriage_id'}.issubset(df_buildings.columns):
         st.success("Buildings CSV loaded successfully!")
     else:
@@ -119,8 +157,18 @@ if df_buildings is not None:
         filtered_buildings = filtered_buildings[filtered_buildings['properties.building_id'] == selected_building_id]
     if selected_building_carriage != 'All':
         filtered_buildings = filtered_buildings[filtered_buildings['properties.carriage_id'] == selected_building_carriage]
+
+    # Kill rows for the proximity views: the page's kill filters (its server
+    # is kill_filter_key[2]; selected_server is now this section's), narrowed
+    # by this section's server; None when nothing is filtered
+    kill_rows = kill_filters.rows({
+        'properties.cause': selected_cause,
+        'properties.carriage_id': selected_carriage,
+        'properties.server_id': kill_filter_key[2],
+    })
     if selected_server != 'All':
-         filtered_data = filtered_data[filtered_data['properties.server_id'] == selected_server]
+        server_rows = kill_filters.rows({'properties.server_id': selected_server})
+        kill_rows = server_rows if kill_rows is None else np.intersect1d(kill_rows, server_rows, assume_unique=True)
 
     # Static 3D Scatter Plot for Buildings
     fig_buildings = px.scatter_3d(
@@ -132,4 +180,47 @@ if df_buildings is not None:
     )
 
     # Display buildings plot
-    st.plotly_chart(fig_buildings)
+    with stage('plotly: buildings scatter', filtered_buildings):
+        st.plotly_chart(fig_buildings)
+
+    # ---- Kills Near Buildings ----
+    # Per-carriage KD-trees, built once per (kills, buildings) upload pair
+    st.title("Kills Near Buildings")
+    with stage('proximity index', data):
+        proximity = proximity_index(data, df_buildings, dataset_key, buildings_key)
+
+    # A fragment: changing the radius only recounts and redraws this table
+    @st.fragment
+    def kills_near_buildings(proximity, kill_rows, filtered_buildings, filter_key):
+        proximity_radius = st.number_input("Radius around each building", min_value=0.1, value=DEFAULT_PROXIMITY_RADIUS, step=1.0)
+        with stage('kills within radius', proximity.n_kills if kill_rows is None else kill_rows) as s:
+            kills_within = s.rows_out = cached_kills_within(
+                proximity, dataset_key, buildings_key, filter_key, proximity_radius, _rows=kill_rows
+            )
+        building_kills = df_buildings.assign(**{'Kills Within Radius': kills_within}).loc[filtered_buildings.index]
+        st.dataframe(
+            building_kills.sort_values('Kills Within Radius', ascending=False).rename(columns={
+                'properties.building_id': 'Building ID',
+                'properties.carriage_id': 'Carriage ID',
+                'properties.loc_x': 'X', 'properties.loc_y': 'Y', 'properties.loc_z': 'Z',
+            }),
+            hide_index=True
+        )
+
+    kills_near_buildings(proximity, kill_rows, filtered_buildings, kill_filter_key + (selected_server,))
+
+    with stage('nearest buildings', proximity.n_kills if kill_rows is None else kill_rows) as s:
+        nearest = s.rows_out = proximity.nearest_buildings(kill_rows).dropna(subset=['Distance'])
+    if nearest.empty:
+        st.info("No kills share a carriage with any building.")
+    else:
+        st.caption(f"{len(nearest):,} kills matched to a building in the same carriage; median distance {nearest['Distance'].median():.1f}")
+        fig_nearest = px.histogram(
+            nearest, x='Distance', color='Nearest Building',
+            nbins=50,
+            title='Distance from Each Kill to the Nearest Building',
+            labels={'Distance': 'Distance to Nearest Building'}
+        )
+        st.plotly_chart(fig_nearest)
+
+timings_panel()
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+
+import streamlit as st
+
+from data_loader import SIDECAR_DIR, dataset_store
+
+# ==============================
+# 📦 Precomputed export artifacts
+# ==============================
+# precompute.py crunches raw exports offline into compact per-export artifacts:
+# the counters, sparse matrices and model fits the dashboards otherwise build
+# at view time. Each artifact is a directory ARTIFACT_DIR/<kind>/<digest>,
+# keyed on the export's content hash (the same sha256 content_hash() gives an
+# upload), with a meta.json describing where it came from.
+#
+# export_source() is how a page gets its export: one already in the shared
+# dataset store (uploaded on any page, by any session), a precomputed artifact,
+# or a new upload. An uploaded export that already has an artifact is loaded
+# from it rather than re-parsed.
+
+ARTIFACT_DIR = os.environ.get('DASHBOARD_ARTIFACT_DIR', os.path.join(SIDECAR_DIR, 'artifacts'))
+
+META_FILE = 'meta.json'
+UPLOAD_OPTION = 'Upload a new file'
+
+# Picker label per export kind (see data_loader.export_kind)
+KIND_TITLES = {
+    'kill_locations': 'Kill locations',
+    'buildings': 'Buildings',
+    'kills': 'Player interactions',
+    'shop': 'Shop export',
+    'events': 'Event counts',
+}
+
+
+def artifact_path(kind, digest, root=ARTIFACT_DIR):
+    return os.path.join(root, kind, digest)
+
+
+def has_artifact(kind, digest, root=ARTIFACT_DIR):
+    return os.path.exists(os.path.join(artifact_path(kind, digest, root), META_FILE))
+
+
+def write_artifact(kind, digest, save, meta, root=ARTIFACT_DIR):
+    """Write an artifact with ``save(directory)``; the directory appears
+    complete or not at all."""
+    path = artifact_path(kind, digest, root)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        save(tmp_path)
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump({'kind': kind, 'digest': digest, **meta}, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+
+def list_artifacts(kind, root=ARTIFACT_DIR):
+    """meta.json of every complete artifact of ``kind``, by source file name."""
+    kind_dir = os.path.join(root, kind)
+    if not os.path.isdir(kind_dir):
+        return []
+    metas = []
+    for digest in os.listdir(kind_dir):
+        if has_artifact(kind, digest, root):
+            with open(os.path.join(artifact_path(kind, digest, root), META_FILE)) as f:
+                metas.append(json.load(f))
+    return sorted(metas, key=lambda meta: meta.get('source', ''))
+
+
+def export_source(kind, label, **uploader_kwargs):
+    """A page's export of ``kind``: (digest or None, precomputed).
+
+    When shared datasets or artifacts of ``kind`` exist, a picker defaults to
+    the most recently used one; otherwise, or if the picker is set to upload,
+    the page's uploader is shown.
+    """
+    store = dataset_store()
+    options = {}
+    for dataset in store.list(kind):
+        size_mb = os.path.getsize(dataset.path) / 2 ** 20
+        options[f"{dataset.name} ({size_mb:,.1f} MB)"] = (dataset.digest, has_artifact(kind, dataset.digest))
+    shared = {digest for digest, _ in options.values()}
+    for meta in list_artifacts(kind):
+        if meta['digest'] not in shared:
+            options[f"📦 {meta['source']} ({meta['rows']:,} rows, precomputed)"] = (meta['digest'], True)
+
+    if options:
+        choice = st.selectbox(f"📂 {KIND_TITLES[kind]}", [*options, UPLOAD_OPTION])
+        if choice != UPLOAD_OPTION:
+            return options[choice]
+
+    uploaded_file = st.file_uploader(label, **uploader_kwargs)
+    if uploaded_file is None:
+        return None, False
+    digest = store.add(uploaded_file)
+    return digest, has_artifact(kind, digest)
@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ==============================
+# 🧪 Synthetic exports
+# ==============================
+# One generator per data shape the dashboards read. Each yields DataFrame
+# chunks with the same columns as the real Mixpanel exports, so a 1e7-row file
+# is written without ever holding all of it in memory. Player, blueprint and
+# location distributions are uniform; what matters here is volume and
+# cardinality, which grow with the row count.
+
+CHUNK_ROWS = 500_000
+
+CAUSES = ['Rifle', 'SMG', 'Shotgun', 'Melee', 'Explosion', 'Fall', 'Toxic', 'Train']
+CARRIAGES = [f'Car{i}' for i in range(1, 9)]
+BUILDINGS = ['Wall', 'Door', 'Bed', 'Workbench', 'Storage', 'Turret']
+ITEMS = ['Rifle_T2', 'Rifle_T3', 'PlasticSMG', 'ImprovShotgun', 'Knife', 'Pickaxe']
+EVENT_TYPES = [
+    'weapon_used', 'syncs_extracted', 'building_placed', 'died', 'crafted',
+    'looted', 'traded', 'repaired', 'revived', 'emoted',
+]
+BLUEPRINTS = [
+    "Exchange.Blueprint.Weapon.Rifle_T2_AlphaStrike_Teal",
+    "Exchange.Blueprint.Weapon.Rifle_T2_AlphaStrike_Red",
+    "Exchange.Blueprint.Clothing.ScrapPunk.Boots",
+    "Exchange.Blueprint.Clothing.ScrapPunk.Jacket",
+    "Exchange.Blueprint.Armor.GasMask_T3_ToxicSkin",
+    "Exchange.Blueprint.Buildable.RecordPlayer",
+    "Exchange.Blueprint.Clothing.Rocker.TShirt",
+    "Exchange.Blueprint.Clothing.Rocker.Gloves",
+    "Exchange.KnowledgeLoadout.ResourceKit",
+    "Exchange.Blueprint.Clothing.Rocker.Headphones",
+    "Exchange.KnowledgeLoadout.BaseInABox",
+    "Exchange.KnowledgeLoadout.PlasticSMG",
+    "Exchange.Blueprint.Clothing.Rocker.Jacket",
+    "Exchange.Blueprint.Weapon.Rifle_T3_Reskin",
+]
+KNOWLEDGE_COLUMNS = 4
+START_TIME = 1_700_000_000
+
+
+def _player_ids(n_players):
+    # 32-char hex ids like Mixpanel's distinct_id
+    return np.char.mod('%032x', np.arange(n_players))
+
+
+def _chunks(n_rows):
+    for start in range(0, n_rows, CHUNK_ROWS):
+        yield min(CHUNK_ROWS, n_rows - start)
+
+
+def kills(n_rows, seed=0):
+    """Kill locations: app.py and c8_issues.py."""
+    rng = np.random.default_rng(seed)
+    for size in _chunks(n_rows):
+        yield pd.DataFrame({
+            'properties.loc_x': (rng.random(size) * 1000).astype(np.float32),
+            'properties.loc_y': (rng.random(size) * 1000).astype(np.float32),
+            'properties.loc_z': (rng.random(size) * 100).astype(np.float32),
+            'properties.cause': rng.choice(CAUSES, size),
+            'properties.carriage_id': rng.choice(CARRIAGES, size),
+            'properties.server_id': rng.choice([f'server{i}' for i in range(1, 6)], size),
+            'time': START_TIME + rng.integers(0, 7 * 86400, size),
+        })
+
+
+def buildings(n_rows, seed=0):
+    """Building placements: app.py's second upload."""
+    rng = np.random.default_rng(seed)
+    for size in _chunks(n_rows):
+        yield pd.DataFrame({
+            'properties.building_id': rng.choice(BUILDINGS, size),
+            'properties.loc_x': (rng.random(size) * 1000).astype(np.float32),
+            'properties.loc_y': (rng.random(size) * 1000).astype(np.float32),
+            'properties.loc_z': (rng.random(size) * 100).astype(np.float32),
+            'properties.carriage_id': rng.choice(CARRIAGES, size),
+        })
+
+
+def interactions(n_rows, seed=0):
+    """Attacker -> target kills: killsapp.py. One player per 20 kills."""
+    rng = np.random.default_rng(seed)
+    players = _player_ids(max(n_rows // 20, 50))
+    for size in _chunks(n_rows):
+        yield pd.DataFrame({
+            'distinct_id': rng.choice(players, size),
+            'target_player_id': rng.choice(players, size),
+            'server_id': rng.choice([f'server{i}' for i in range(1, 6)], size),
+            'item_id': rng.choice(ITEMS, size),
+            'time': START_TIME + rng.integers(0, 7 * 86400, size),
+        })
+
+
+def shop(n_rows, seed=0):
+    """knowledge_granted exports: shop_app.py. Times are in ms."""
+    rng = np.random.default_rng(seed)
+    players = _player_ids(max(n_rows // 5, 50))
+    for size in _chunks(n_rows):
+        chunk = pd.DataFrame({
+            'distinct_id': rng.choice(players, size),
+            'time': (START_TIME + rng.integers(0, 30 * 86400, size)) * 1000,
+        })
+        for i in range(KNOWLEDGE_COLUMNS):
+            granted = rng.choice(BLUEPRINTS, size).astype(object)
+            granted[rng.random(size) < 0.7] = None
+            chunk[f'properties.knowledge_granted.{i}'] = granted
+        yield chunk
+
+
+def events(n_rows, seed=0):
+    """Long (player, event type, count) exports: 3d_player_types.py.
+    About eight rows per player; counts are heavy-tailed like real activity."""
+    rng = np.random.default_rng(seed)
+    players = _player_ids(max(n_rows // 8, 10))
+    for size in _chunks(n_rows):
+        yield pd.DataFrame({
+            'key.0': rng.choice(players, size),
+            'key.1': rng.choice(EVENT_TYPES, size),
+            'value': np.ceil(rng.lognormal(2.5, 1.0, size)).astype(np.int64),
+        })
+
+
+GENERATORS = {
+    'kills': kills,
+    'buildings': buildings,
+    'interactions': interactions,
+    'shop': shop,
+    'events': events,
+}
+
+
+def write_csv(shape, n_rows, path, seed=0):
+    """Write ``n_rows`` of ``shape`` to ``path`` chunk by chunk."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        for i, chunk in enumerate(GENERATORS[shape](n_rows, seed)):
+            chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def dataset(shape, n_rows, data_dir, seed=0):
+    """Path to a generated CSV, generating it on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'{shape}-{n_rows}-{seed}.csv')
+    if not os.path.exists(path):
+        write_csv(shape, n_rows, path, seed)
+    return path
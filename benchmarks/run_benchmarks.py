@@ -0,0 +1,216 @@
+"""Headless benchmark of every dashboard over synthetic exports.
+
+    python benchmarks/run_benchmarks.py                      # all pages, 1e3..1e5 rows
+    python benchmarks/run_benchmarks.py --pages killsapp --sizes 1e6 1e7
+
+Each (page, size) case runs in a fresh Python process, so caches start cold
+and peak RSS belongs to that case alone. The case loads the page through
+Streamlit's AppTest, then changes each widget once and reruns. One JSON line
+per case is appended to --out.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Mapping
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from generators import dataset  # noqa: E402
+
+ENTRY = os.path.join(BENCH_DIR, 'apptest_entry.py')
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'dashboard-bench-data')
+DEFAULT_OUT = os.path.join(BENCH_DIR, 'results.jsonl')
+DEFAULT_SIZES = ['1e3', '1e4', '1e5']
+CASE_TIMEOUT = 3600
+
+# page -> (script, {uploader label substring: (data shape, rows per kill/event row)})
+PAGES = {
+    'app': ('app.py', {'Upload CSV file': ('kills', 1.0), 'Buildings': ('buildings', 0.01)}),
+    'c8_issues': ('c8_issues.py', {'Upload CSV file': ('kills', 1.0)}),
+    'killsapp': ('killsapp.py', {'Player Interaction': ('interactions', 1.0)}),
+    'shop_app': ('shop_app.py', {'Mixpanel': ('shop', 1.0)}),
+    '3d_player_types': ('3d_player_types.py', {'key.0': ('events', 1.0)}),
+}
+
+WIDGET_KINDS = ['selectbox', 'multiselect', 'slider', 'checkbox', 'toggle', 'radio', 'number_input']
+
+
+# --- Inside a case process
+
+def _payload_bytes(at):
+    """Bytes of figure specs and dataframes the page sent to the browser."""
+    figures = sum(len(el.proto.spec) for el in at.get('plotly_chart'))
+    tables = sum(len(el.proto.data) for el in at.dataframe)
+    return {'figure_bytes': figures, 'dataframe_bytes': tables}
+
+
+def _exceptions(at):
+    return [e.message for e in at.exception]
+
+
+def _option_values(widget):
+    """A select widget's option values in label order. AppTest only sees the
+    labels; when format_func looks values up in a dict (``labels.get``), the
+    dict's keys are the values."""
+    format_func = widget.format_func
+    owner = getattr(format_func, '__self__', None)
+    candidates = list(owner) if isinstance(owner, Mapping) else list(widget.options)
+    by_label = {str(format_func(value)): value for value in candidates}
+    return [by_label[label] for label in widget.options if label in by_label]
+
+
+def _change(widget, kind):
+    """Move a widget to some other value; False if it has nowhere to go."""
+    if kind == 'selectbox' or kind == 'radio':
+        values = _option_values(widget)
+        if len(values) < 2:
+            return False
+        current = values.index(widget.value) if widget.value in values else -1
+        widget.set_value(values[1 if current == 0 else 0])
+    elif kind == 'multiselect':
+        if widget.value:
+            widget.set_value(widget.value[:-1])
+        elif widget.options:
+            widget.set_value(widget.options[:1])
+        else:
+            return False
+    elif kind == 'slider':
+        if isinstance(widget.value, (tuple, list)):
+            return False
+        # One step, like a user nudging it; jumping to an extreme can make a
+        # case measure a pathological setting instead of a typical rerun
+        step = widget.step or (widget.max - widget.min) / 100
+        if widget.value + step <= widget.max:
+            widget.set_value(type(widget.value)(widget.value + step))
+        else:
+            widget.set_value(type(widget.value)(widget.value - step))
+    elif kind in ('checkbox', 'toggle'):
+        widget.set_value(not widget.value)
+    elif kind == 'number_input':
+        widget.increment()
+    return True
+
+
+def run_case(page, n_rows, data_dir, timeout=CASE_TIMEOUT):
+    from streamlit.testing.v1 import AppTest
+
+    script, uploads = PAGES[page]
+    upload_paths = {
+        label: dataset(shape, max(int(n_rows * scale), 100), data_dir)
+        for label, (shape, scale) in uploads.items()
+    }
+    os.environ['BENCH_TARGET'] = os.path.join(REPO_DIR, script)
+    os.environ['BENCH_UPLOADS'] = json.dumps(upload_paths)
+
+    at = AppTest.from_file(ENTRY, default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    result = {
+        'page': page,
+        'rows': n_rows,
+        'cold_load_s': round(time.perf_counter() - start, 4),
+        **_payload_bytes(at),
+        'exceptions': _exceptions(at),
+        'reruns': [],
+    }
+
+    # Widgets present after the cold load, each changed once in turn
+    widgets = [(kind, w.label) for kind in WIDGET_KINDS for w in getattr(at, kind)]
+    for kind, label in widgets:
+        matches = [w for w in getattr(at, kind) if w.label == label]
+        if not matches or not _change(matches[0], kind):
+            continue
+        start = time.perf_counter()
+        at.run()
+        result['reruns'].append({
+            'widget': f'{kind}: {label}',
+            'seconds': round(time.perf_counter() - start, 4),
+            **_payload_bytes(at),
+            'exceptions': _exceptions(at),
+        })
+
+    # ru_maxrss is in KiB on Linux
+    result['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+# --- Driver
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_in_subprocess(page, n_rows, data_dir, timeout):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ)
+        # Cold sidecar and rollup stores for every case
+        env['DASHBOARD_CACHE_DIR'] = os.path.join(cache_dir, 'datasets')
+        env['SHOP_ROLLUP_DIR'] = os.path.join(cache_dir, 'rollups')
+        env['DASHBOARD_ARTIFACT_DIR'] = os.path.join(cache_dir, 'artifacts')
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--case', page, str(n_rows), '--data-dir', data_dir],
+            env=env, capture_output=True, text=True, timeout=timeout
+        )
+    lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+    if proc.returncode != 0 or not lines:
+        return {'page': page, 'rows': n_rows, 'error': proc.stderr.strip().splitlines()[-5:]}
+    return json.loads(lines[-1])
+
+
+def _summary(result):
+    if 'error' in result:
+        return f"{result['page']:<16} {result['rows']:>10,}  ERROR {' | '.join(result['error'])}"
+    reruns = [r['seconds'] for r in result['reruns']]
+    worst = max(reruns) if reruns else 0.0
+    failed = ' EXC' if result['exceptions'] or any(r['exceptions'] for r in result['reruns']) else ''
+    return (
+        f"{result['page']:<16} {result['rows']:>10,}  cold {result['cold_load_s']:>8.2f}s  "
+        f"worst rerun {worst:>7.2f}s  peak {result['peak_rss_mb']:>8.1f} MB  "
+        f"figures {result['figure_bytes'] / 1e6:>7.2f} MB{failed}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES))
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='row counts, e.g. 1e3 1e6')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='where generated CSVs are kept')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='JSON-lines file results are appended to')
+    parser.add_argument('--timeout', type=int, default=CASE_TIMEOUT, help='seconds per case')
+    parser.add_argument('--case', nargs=2, metavar=('PAGE', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        page, n_rows = args.case
+        print(json.dumps(run_case(page, int(n_rows), args.data_dir, args.timeout)), flush=True)
+        # Don't wait for background work (e.g. the KMeans sweep) to drain, and
+        # don't leave pool workers holding the driver's output pipe open
+        for child in multiprocessing.active_children():
+            child.terminate()
+        os._exit(0)
+
+    revision = _git_revision()
+    for n_rows in (int(float(size)) for size in args.sizes):
+        for page in args.pages:
+            result = _run_in_subprocess(page, n_rows, args.data_dir, args.timeout)
+            result.update(revision=revision, timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'))
+            with open(args.out, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+            print(_summary(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy import sparse
+
+from artifacts import artifact_path
+from data_loader import SHOP_PREFIXES
+
+# ==============================
+# 🧾 Blueprint ownership
+# ==============================
+# Who owns what, as one sparse boolean player × blueprint matrix built once per
+# upload. Each properties.knowledge_granted.* column is encoded straight into
+# (player, blueprint) coordinates, so the export is never melted into a long
+# frame. Group counts are column sums, "acquired any" and "acquired all" are
+# row-wise checks over a slice of columns.
+
+
+def knowledge_columns(df, prefixes=SHOP_PREFIXES):
+    return [col for col in df.columns if col.startswith(tuple(prefixes))]
+
+
+class OwnershipMatrix:
+    """Sparse boolean matrix of players (rows) by granted blueprints (columns)."""
+
+    def __init__(self, df, columns=None):
+        columns = knowledge_columns(df) if columns is None else columns
+        players = df['distinct_id'].astype('category')
+        self.players = pd.Index(players.cat.categories, dtype=object)
+        player_codes = players.cat.codes.to_numpy()
+
+        granted = [df[col].astype('category') for col in columns]
+        self.blueprints = pd.Index(
+            sorted(set().union(*(values.cat.categories for values in granted))), dtype=object
+        )
+
+        rows, cols = [], []
+        for values in granted:
+            # Map the column's own categories onto the shared blueprint index
+            blueprint_codes = self.blueprints.get_indexer(values.cat.categories)
+            codes = values.cat.codes.to_numpy()
+            present = (codes >= 0) & (player_codes >= 0)
+            rows.append(player_codes[present])
+            cols.append(blueprint_codes[codes[present]])
+
+        rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.array([], dtype=np.int64)
+        # coo -> csr sums repeated grants; any count means owned
+        counts = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(self.players), len(self.blueprints))
+        ).tocsc()
+        self.M = counts.astype(bool)
+
+    def save(self, path):
+        """Write the matrix and its player / blueprint labels to ``path``."""
+        sparse.save_npz(os.path.join(path, 'ownership.npz'), self.M)
+        pd.DataFrame({'distinct_id': self.players}).to_parquet(os.path.join(path, 'players.parquet'), index=False)
+        pd.DataFrame({'Blueprint': self.blueprints}).to_parquet(os.path.join(path, 'blueprints.parquet'), index=False)
+
+    @classmethod
+    def load(cls, path):
+        ownership = cls.__new__(cls)
+        ownership.M = sparse.load_npz(os.path.join(path, 'ownership.npz')).tocsc()
+        ownership.players = pd.Index(pd.read_parquet(os.path.join(path, 'players.parquet'))['distinct_id'], dtype=object)
+        ownership.blueprints = pd.Index(pd.read_parquet(os.path.join(path, 'blueprints.parquet'))['Blueprint'], dtype=object)
+        return ownership
+
+    def _columns(self, items):
+        codes = self.blueprints.get_indexer(pd.Index(items, dtype=object))
+        return codes[codes >= 0], bool((codes >= 0).all())
+
+    def counts(self, items):
+        """Unique players per blueprint in ``items`` (owned blueprints only)."""
+        cols, _ = self._columns(items)
+        cols = np.sort(cols)
+        owners = self.M[:, cols].getnnz(axis=0)
+        counts = pd.DataFrame({'Blueprint': self.blueprints[cols], 'Count': owners})
+        return counts[counts['Count'] > 0].reset_index(drop=True)
+
+    def owners_of_any(self, items):
+        """Players who own at least one of ``items``."""
+        cols, _ = self._columns(items)
+        return self.players[self.M[:, cols].getnnz(axis=1) > 0].tolist()
+
+    def owners_of_all(self, items):
+        """Players who own every one of ``items``."""
+        cols, complete = self._columns(items)
+        if not complete:
+            # Nobody has been granted at least one of the items
+            return []
+        cols = np.unique(cols)
+        return self.players[self.M[:, cols].getnnz(axis=1) == len(cols)].tolist()
+
+
+@st.cache_resource(max_entries=8, show_spinner="Indexing blueprint ownership...")
+def ownership_matrix(_df, dataset_key):
+    return OwnershipMatrix(_df)
+
+
+@st.cache_resource(max_entries=8, show_spinner="Loading precomputed ownership...")
+def ownership_artifact(digest):
+    return OwnershipMatrix.load(artifact_path('shop', digest))
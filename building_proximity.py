@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy.spatial import cKDTree
+
+from kill_locations import LOC_COLUMNS
+
+# ==============================
+# 🏠 Kills near buildings
+# ==============================
+# Kills and buildings are joined per carriage: a KD-tree over each carriage's
+# building positions answers "nearest building" for all of that carriage's
+# kills in one batch query, and a KD-tree over its kills answers "how many
+# kills within r" for all of its buildings in another. Both are built once per
+# (kills upload, buildings upload) pair; changing the radius only re-runs the
+# counting step. A filtered selection is counted against trees over just the
+# selected kills of each carriage, so counting never expands neighbour lists.
+
+CARRIAGE_COLUMN = 'properties.carriage_id'
+DEFAULT_PROXIMITY_RADIUS = 10.0
+
+
+def _carriage_groups(df, valid):
+    """{carriage: row positions}, skipping rows without a carriage and rows
+    not in the ``valid`` mask."""
+    codes = df[CARRIAGE_COLUMN].astype('category')
+    order = np.flatnonzero(valid)
+    order = order[np.argsort(codes.cat.codes.to_numpy()[order], kind='stable')]
+    sorted_codes = codes.cat.codes.to_numpy()[order]
+    groups = {}
+    for i, carriage in enumerate(codes.cat.categories):
+        start, end = np.searchsorted(sorted_codes, [i, i + 1])
+        if end > start:
+            groups[carriage] = order[start:end]
+    return groups
+
+
+def _coords(df):
+    return df[LOC_COLUMNS].to_numpy(dtype=np.float64)
+
+
+class ProximityIndex:
+    """Per-carriage KD-trees over one kills frame and one buildings frame."""
+
+    def __init__(self, kills, buildings):
+        self.n_kills = len(kills)
+        self.building_ids = buildings['properties.building_id'].astype(object).to_numpy()
+        kill_xyz, building_xyz = _coords(kills), _coords(buildings)
+        # KD-trees need finite coordinates; rows with a missing loc are left out
+        kill_groups = _carriage_groups(kills, np.isfinite(kill_xyz).all(axis=1))
+        building_groups = _carriage_groups(buildings, np.isfinite(building_xyz).all(axis=1))
+
+        # Nearest building for every kill; kills in a carriage without
+        # buildings (or without a carriage or location) stay at -1 / NaN
+        self.nearest = np.full(self.n_kills, -1, dtype=np.int64)
+        self.distance = np.full(self.n_kills, np.nan)
+        self.kill_trees = {}
+        for carriage, building_rows in building_groups.items():
+            kill_rows = kill_groups.get(carriage)
+            if kill_rows is None:
+                continue
+            tree = cKDTree(building_xyz[building_rows])
+            distance, nearest = tree.query(kill_xyz[kill_rows], k=1, workers=-1)
+            self.nearest[kill_rows] = building_rows[nearest]
+            self.distance[kill_rows] = distance
+            self.kill_trees[carriage] = (cKDTree(kill_xyz[kill_rows]), kill_rows, building_rows, building_xyz[building_rows])
+        self.n_buildings = len(buildings)
+
+    def nearest_buildings(self, rows=None):
+        """Nearest building id and distance for each kill (or each of ``rows``)."""
+        nearest = self.nearest if rows is None else self.nearest[rows]
+        distance = self.distance if rows is None else self.distance[rows]
+        found = nearest >= 0
+        building = np.full(len(nearest), None, dtype=object)
+        building[found] = self.building_ids[nearest[found]]
+        return pd.DataFrame({'Nearest Building': building, 'Distance': distance})
+
+    def kills_within(self, radius, rows=None):
+        """Kills within ``radius`` of each building, counting only ``rows``
+        (kill positions) when given. A kill near two buildings counts for both."""
+        counts = np.zeros(self.n_buildings, dtype=np.int64)
+        if rows is not None:
+            selected = np.zeros(self.n_kills, dtype=bool)
+            selected[rows] = True
+
+        for tree, kill_rows, building_rows, building_xyz in self.kill_trees.values():
+            if rows is not None:
+                in_selection = selected[kill_rows]
+                if not in_selection.any():
+                    continue
+                if not in_selection.all():
+                    tree = cKDTree(tree.data[in_selection])
+            counts[building_rows] = tree.query_ball_point(building_xyz, radius, return_length=True, workers=-1)
+        return counts
+
+
+@st.cache_resource(max_entries=8, show_spinner="Indexing kills and buildings...")
+def proximity_index(_kills, _buildings, kills_key, buildings_key):
+    # One index per (kills upload, buildings upload) pair
+    return ProximityIndex(_kills, _buildings)
+
+
+@st.cache_data(max_entries=64, show_spinner="Counting kills near buildings...")
+def cached_kills_within(_index, kills_key, buildings_key, filters, radius, _rows=None):
+    # ``filters`` stands in for ``_rows`` in the cache key
+    return _index.kills_within(radius, _rows)
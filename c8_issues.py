@@ -4,15 +4,32 @@ import numpy as np
 import pandas as pd
 import time
 
+from artifacts import export_source
+from data_loader import KILL_SCHEMA, load_dataset
+from kill_locations import (
+    DEFAULT_DENSITY_BINS,
+    DEFAULT_VOXEL_RESOLUTION,
+    LOD_MIN_POINTS,
+    cached_density,
+    cached_voxels,
+    density_heatmap_figure,
+    density_volume_figure,
+    filter_index,
+    voxel_figure,
+)
+from stage_timing import stage, start_page, timings_panel
+
 # Streamlit app title
 st.title("3D Scatter Plot and Cause Distribution Dashboard")
+start_page('c8_issues')
 
-# File uploader
-uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
+# File uploader (or a kill export already shared by another page)
+dataset_key, _ = export_source('kill_locations', "Upload CSV file", type=["csv"])
 
 # Load or generate data
-if uploaded_file is not None:
-    data = pd.read_csv(uploaded_file)
+if dataset_key is not None:
+    with stage('read_csv: kills') as s:
+        data = s.rows_out = load_dataset(dataset_key, KILL_SCHEMA)
     required_columns = {
         'properties.loc_x', 'properties.loc_y', 'properties.loc_z',
         'properties.cause', 'properties.carriage_id', 'properties.server_id'
@@ -25,6 +42,7 @@ else:
     # Generate test data
     np.random.seed(42)
     n = 100
+    dataset_key = 'synthetic'
     data = pd.DataFrame({
         'properties.loc_x': np.random.rand(n) * 10,
         'properties.loc_y': np.random.rand(n) * 10,
@@ -37,50 +55,96 @@ else:
 # Sidebar filters
 st.sidebar.header("Filters")
 
+# Per-value row lists for the three filters, built once per dataset
+with stage('filter index', data):
+    kill_filters = filter_index(data, dataset_key)
+
 # Cause filter
-cause_options = ['All'] + sorted(data['properties.cause'].unique())
+cause_options = ['All'] + kill_filters.values('properties.cause')
 selected_cause = st.sidebar.selectbox("Select Cause", cause_options)
 
 # Carriage ID filter
-carriage_options = ['All'] + sorted(data['properties.carriage_id'].unique())
+carriage_options = ['All'] + kill_filters.values('properties.carriage_id')
 selected_carriage = st.sidebar.selectbox("Select Carriage ID", carriage_options)
 
 # Server filter
-server_options = ['All'] + sorted(data['properties.server_id'].unique())
+server_options = ['All'] + kill_filters.values('properties.server_id')
 selected_server = st.sidebar.selectbox("Select Server", server_options)
 
-# Apply filters
-filtered_data = data.copy()
-if selected_cause != 'All':
-    filtered_data = filtered_data[filtered_data['properties.cause'] == selected_cause]
-if selected_carriage != 'All':
-    filtered_data = filtered_data[filtered_data['properties.carriage_id'] == selected_carriage]
-if selected_server != 'All':
-    filtered_data = filtered_data[filtered_data['properties.server_id'] == selected_server]
-
-# 3D Scatter Plot
-fig_static = px.scatter_3d(
-    filtered_data.copy(),
-    x='properties.loc_x', y='properties.loc_y', z='properties.loc_z',
-    color='properties.cause',
-    title='3D Scatter Plot (Filtered)',
-    labels={
-        'properties.loc_x': 'X',
-        'properties.loc_y': 'Y',
-        'properties.loc_z': 'Z',
-        'properties.cause': 'Cause'
-    }
-)
+# Apply filters: intersect row lists, then a single take() (no intermediate copies)
+with stage('filter kills', data) as s:
+    filtered_data = s.rows_out = kill_filters.select(data, {
+        'properties.cause': selected_cause,
+        'properties.carriage_id': selected_carriage,
+        'properties.server_id': selected_server,
+    })
+kill_filter_key = (selected_cause, selected_carriage, selected_server)
 
-# Display scatter plot
-st.plotly_chart(fig_static, use_container_width=True)
+# The scatter and density views are fragments: their own widgets only redraw
+# that chart. Fragments cannot write to the sidebar, so those widgets sit
+# above their chart
+
+# 3D Scatter Plot; large selections are drawn as one marker per voxel
+@st.fragment
+def scatter_section(filtered_data, kill_filter_key):
+    if len(filtered_data) > LOD_MIN_POINTS:
+        resolution_col, color_col = st.columns(2)
+        voxel_resolution = resolution_col.slider("Voxel resolution", min_value=16, max_value=128, value=DEFAULT_VOXEL_RESOLUTION, step=8)
+        voxel_color = color_col.radio("Color voxels by", ['Dominant Cause', 'Kills'], horizontal=True)
+        with stage('voxelize', filtered_data) as s:
+            voxels = s.rows_out = cached_voxels(filtered_data, dataset_key, kill_filter_key, voxel_resolution)
+        fig_static = voxel_figure(voxels, voxel_color, title='3D Scatter Plot (Filtered, Voxel LOD)')
+        st.caption(f"{len(filtered_data):,} kills drawn as {len(voxels):,} voxels")
+    else:
+        fig_static = px.scatter_3d(
+            filtered_data,
+            x='properties.loc_x', y='properties.loc_y', z='properties.loc_z',
+            color='properties.cause',
+            title='3D Scatter Plot (Filtered)',
+            labels={
+                'properties.loc_x': 'X',
+                'properties.loc_y': 'Y',
+                'properties.loc_z': 'Z',
+                'properties.cause': 'Cause'
+            }
+        )
+
+    # Display scatter plot
+    with stage('plotly: scatter', filtered_data):
+        st.plotly_chart(fig_static, use_container_width=True)
+
+scatter_section(filtered_data, kill_filter_key)
+
+# Kill density: binned once per dataset/filter/bin count, drawn from the bins
+@st.fragment
+def density_section(filtered_data, kill_filter_key):
+    st.subheader("Density")
+    view_col, bins_col = st.columns(2)
+    density_view = view_col.radio("Density view", ['Off', '3D volume', 'Top-down heatmap'], horizontal=True)
+    if density_view == 'Off':
+        return
+    density_bins = bins_col.slider("Density bins per axis", min_value=8, max_value=64, value=DEFAULT_DENSITY_BINS, step=4)
+    with stage('density bins', filtered_data) as s:
+        counts, edges = cached_density(filtered_data, dataset_key, kill_filter_key, density_bins)
+        s.rows_out = counts.size
+    if density_view == '3D volume':
+        fig_density = density_volume_figure(counts, edges, title='3D Kill Density (Filtered)')
+    else:
+        fig_density = density_heatmap_figure(counts, edges, title='Top-Down Kill Density (Filtered)')
+    with stage('plotly: density', counts.size):
+        st.plotly_chart(fig_density, use_container_width=True)
+
+density_section(filtered_data, kill_filter_key)
 
 # Pie Chart of Cause Distribution
-cause_counts = filtered_data['properties.cause'].value_counts().reset_index()
-cause_counts.columns = ['Cause', 'Count']
+with stage('cause counts', filtered_data) as s:
+    cause_counts = filtered_data['properties.cause'].value_counts().reset_index()
+    cause_counts.columns = ['Cause', 'Count']
+    # Categorical value_counts also lists causes filtered out entirely
+    cause_counts = s.rows_out = cause_counts[cause_counts['Count'] > 0]
 
 fig_pie = px.pie(
-    cause_counts.copy(),
+    cause_counts,
     names='Cause',
     values='Count',
     title='Distribution of Causes',
@@ -89,3 +153,5 @@ fig_pie = px.pie(
 
 # Display pie chart
 st.plotly_chart(fig_pie, use_container_width=True)
+
+timings_panel()
@@ -0,0 +1,42 @@
+import os
+
+import streamlit as st
+
+from data_loader import dataset_store
+
+# ==============================
+# 🧭 All dashboards in one app
+# ==============================
+# Each page is still a standalone script (streamlit run killsapp.py works as
+# before). Run together here they share one server process, so an export
+# uploaded on any page is parsed once and offered to every other page and
+# session from the shared dataset store.
+
+PAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+st.set_page_config(page_title="Game Analytics", page_icon="🎮")
+
+
+def page(script, **kwargs):
+    return st.Page(os.path.join(PAGE_DIR, script), **kwargs)
+
+
+pages = st.navigation({
+    "Kills": [
+        page("app.py", title="Kill & Building Locations", icon="🗺️", url_path="locations", default=True),
+        page("c8_issues.py", title="Kill Causes", icon="🥧", url_path="causes"),
+        page("killsapp.py", title="Kill Network", icon="🤔", url_path="network"),
+    ],
+    "Players": [
+        page("3d_player_types.py", title="Player Types", icon="🎮", url_path="player-types"),
+        page("shop_app.py", title="Shop", icon="🛒", url_path="shop"),
+    ],
+})
+
+store = dataset_store()
+st.sidebar.caption(
+    f"📂 {len(store.list())} shared dataset(s), "
+    f"{store.nbytes() / 2 ** 20:,.0f} / {store.budget_bytes / 2 ** 20:,.0f} MB in memory"
+)
+
+pages.run()
@@ -0,0 +1,368 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import streamlit as st
+
+# ==============================
+# 📥 Shared CSV ingestion
+# ==============================
+# Every dashboard loads its uploads through load_dataset(). An upload is
+# registered once, under its content hash, in a DatasetStore shared by every
+# page and session: its bytes are copied to disk and each frame parsed from it
+# is kept, so reruns (every widget click), other pages and other sessions hand
+# back the same frame instead of re-parsing the Mixpanel export.
+# Parsed frames count against DATASET_MEMORY_BUDGET_MB; past it, the frames of
+# the least recently used datasets are released and re-parsed from disk when
+# next needed.
+#
+# Each page passes a schema: {column: dtype}. Only those columns are read and
+# a dtype of None lets the parser infer it. Cached frames are shared between
+# reruns and sessions, so pages must treat them as read-only.
+#
+# The first load of an upload also writes an uncompressed Arrow IPC sidecar to
+# SIDECAR_DIR. Later loads (including after a server restart) memory-map that
+# file instead of parsing the CSV, and processes reading the same sidecar share
+# its pages through the OS page cache.
+
+SIDECAR_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '.dataset_cache')
+UPLOAD_DIR = os.path.join(SIDECAR_DIR, 'uploads')
+DATASET_MEMORY_BUDGET_MB = float(os.environ.get('DASHBOARD_MEMORY_BUDGET_MB', 2048))
+
+# pandas dtype -> Arrow type used while converting; 'category' is stored as
+# plain strings and dictionary-encoded when the sidecar is loaded.
+_ARROW_TYPES = {
+    'float32': pa.float32(),
+    'float64': pa.float64(),
+    'int64': pa.int64(),
+    'category': pa.string(),
+}
+
+# pandas.read_csv's default NA markers; string columns in the sidecar use them
+# too so blank cells come back as NaN whichever path parsed the file.
+_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null',
+]
+
+KILL_SCHEMA = {
+    'properties.loc_x': 'float32',
+    'properties.loc_y': 'float32',
+    'properties.loc_z': 'float32',
+    'properties.cause': 'category',
+    'properties.carriage_id': 'category',
+    'properties.server_id': 'category',
+    'time': None,
+}
+
+BUILDING_SCHEMA = {
+    'properties.building_id': 'category',
+    'properties.loc_x': 'float32',
+    'properties.loc_y': 'float32',
+    'properties.loc_z': 'float32',
+    'properties.carriage_id': 'category',
+}
+
+INTERACTION_SCHEMA = {
+    'distinct_id': 'category',
+    'target_player_id': 'category',
+    'server_id': 'category',
+    'item_id': 'category',
+}
+
+SHOP_SCHEMA = {
+    'distinct_id': 'category',
+    'time': None,
+}
+SHOP_PREFIXES = ('properties.knowledge_granted.',)
+
+# The event-count export has no usable header; columns are taken by position.
+EVENT_COUNT_NAMES = ('distinct_id', 'event_type', 'count')
+EVENT_COUNT_SCHEMA = {
+    'distinct_id': 'category',
+    'event_type': 'category',
+    'count': 'float64',
+}
+
+
+def export_kind(columns):
+    """Which page an export is for, from its header: 'kill_locations',
+    'buildings', 'kills' (player interactions), 'shop', 'events' or None."""
+    columns = list(columns)
+    if 'properties.building_id' in columns:
+        return 'buildings'
+    if {'properties.loc_x', 'properties.loc_y', 'properties.loc_z'}.issubset(columns):
+        return 'kill_locations'
+    if set(INTERACTION_SCHEMA).issubset(columns):
+        return 'kills'
+    if 'distinct_id' in columns and any(col.startswith(SHOP_PREFIXES) for col in columns):
+        return 'shop'
+    if columns[:3] == ['key.0', 'key.1', 'value']:
+        return 'events'
+    return None
+
+
+# file_id -> content hash, so a rerun doesn't re-hash the same upload. Every
+# new upload gets a new file_id, so only the most recent ones are kept.
+UPLOAD_HASH_ENTRIES = 64
+_upload_hashes = OrderedDict()
+_upload_hashes_lock = threading.Lock()
+
+
+def content_hash(uploaded_file):
+    """Return the sha256 of an uploaded file's bytes (memoized per upload)."""
+    file_id = getattr(uploaded_file, 'file_id', None)
+    with _upload_hashes_lock:
+        if file_id is not None and file_id in _upload_hashes:
+            _upload_hashes.move_to_end(file_id)
+            return _upload_hashes[file_id]
+    digest = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    if file_id is not None:
+        with _upload_hashes_lock:
+            _upload_hashes[file_id] = digest
+            while len(_upload_hashes) > UPLOAD_HASH_ENTRIES:
+                _upload_hashes.popitem(last=False)
+    return digest
+
+
+def _open(source):
+    # CSV bytes, or a path to the CSV
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _resolve_columns(header, schema, prefixes):
+    # Keep the file's own column order; missing schema columns are simply not
+    # read, so each page's required-column check still reports them.
+    return [col for col in header if col in schema or (prefixes and col.startswith(prefixes))]
+
+
+def parse_csv(source, schema, prefixes=(), prefix_dtype=None, names=None):
+    """Parse CSV bytes (or a CSV path) with a page schema (see load_dataset),
+    without caching or a sidecar."""
+    if names is not None:
+        df = pd.read_csv(
+            _open(source),
+            header=0,
+            names=list(names),
+            usecols=list(range(len(names))),
+            dtype={col: dtype for col, dtype in schema.items() if dtype is not None},
+        )
+        return df
+
+    header = pd.read_csv(_open(source), nrows=0).columns
+    usecols = _resolve_columns(header, schema, prefixes)
+    dtypes = {col: schema[col] for col in usecols if schema.get(col) is not None}
+    if prefix_dtype is not None:
+        dtypes.update({col: prefix_dtype for col in usecols if col not in schema})
+
+    return pd.read_csv(_open(source), usecols=usecols, dtype=dtypes)
+
+
+def _schema_key(schema, prefixes, prefix_dtype, names):
+    # Sidecars hold only the columns a schema selects, so the file name has to
+    # include the selection as well as the content hash.
+    # The leading version retires sidecars written before blank strings were
+    # read as nulls.
+    spec = repr((2, sorted(schema.items()), prefixes, prefix_dtype, names))
+    return hashlib.sha256(spec.encode()).hexdigest()[:12]
+
+
+def sidecar_path(digest, schema, prefixes=(), prefix_dtype=None, names=None):
+    """Return where the Arrow sidecar for an upload and column selection lives."""
+    key = _schema_key(schema, tuple(prefixes), prefix_dtype, names)
+    return os.path.join(SIDECAR_DIR, f"{digest}-{key}.arrow")
+
+
+def _write_sidecar(source, path, schema, prefixes, prefix_dtype, names):
+    header = pd.read_csv(_open(source), nrows=0).columns.tolist()
+    if names is not None:
+        read_options = pa_csv.ReadOptions(skip_rows=1, column_names=list(names) + header[len(names):])
+        usecols = list(names)
+    else:
+        read_options = pa_csv.ReadOptions()
+        usecols = _resolve_columns(header, schema, prefixes)
+
+    column_types = {}
+    for col in usecols:
+        dtype = schema[col] if col in schema else prefix_dtype
+        if dtype is not None:
+            column_types[col] = _ARROW_TYPES[dtype]
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=usecols,
+        column_types=column_types,
+        null_values=_NULL_VALUES,
+        strings_can_be_null=True,
+    )
+
+    # Stream batches straight to disk so conversion memory stays bounded;
+    # the rename makes a half-written sidecar invisible to other sessions.
+    os.makedirs(SIDECAR_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        reader = pa_csv.open_csv(_open(source), read_options=read_options, convert_options=convert_options)
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_sidecar(path, schema, prefix_dtype):
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    for i, col in enumerate(table.column_names):
+        dtype = schema[col] if col in schema else prefix_dtype
+        if dtype == 'category':
+            table = table.set_column(i, col, pc.dictionary_encode(table[col]))
+    # split_blocks lets null-free numeric columns stay views onto the mapping
+    return table.to_pandas(split_blocks=True)
+
+
+def _parse_dataset(source, digest, schema, prefixes, prefix_dtype, names):
+    path = sidecar_path(digest, schema, prefixes, prefix_dtype, names)
+    if not os.path.exists(path):
+        try:
+            _write_sidecar(source, path, schema, prefixes, prefix_dtype, names)
+        except (pa.ArrowInvalid, OSError):
+            # Ragged or oddly typed exports that Arrow refuses still load
+            # through pandas, just without a sidecar.
+            return parse_csv(source, schema, prefixes, prefix_dtype, names)
+    return _read_sidecar(path, schema, prefix_dtype)
+
+
+def _write_upload(raw, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class Dataset:
+    """One shared export: its copy on disk and every frame parsed from it."""
+
+    def __init__(self, digest, name, path):
+        self.digest = digest
+        self.name = name
+        self.path = path
+        self.columns = pd.read_csv(path, nrows=0).columns.tolist()
+        self.kind = export_kind(self.columns)
+        self.frames = {}
+        self.sizes = {}
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return sum(self.sizes.values())
+
+    def frame(self, schema, prefixes=(), prefix_dtype=None, names=None):
+        key = (tuple(sorted(schema.items())), tuple(prefixes), prefix_dtype, names)
+        with self.lock:
+            if key not in self.frames:
+                with st.spinner("Loading dataset..."):
+                    df = _parse_dataset(self.path, self.digest, schema, tuple(prefixes), prefix_dtype, names)
+                self.frames[key] = df
+                self.sizes[key] = int(df.memory_usage(deep=True).sum())
+            return self.frames[key]
+
+    def release(self):
+        """Drop the parsed frames; the copy on disk is parsed again on next use."""
+        with self.lock:
+            self.frames.clear()
+            self.sizes.clear()
+
+
+class DatasetStore:
+    """Every uploaded export, shared by all pages and sessions.
+
+    Datasets are kept in least-recently-used order; once their parsed frames
+    exceed ``budget_mb`` the oldest datasets' frames are released (the one in
+    use never is). Every dataset stays listed and reloads from disk on demand.
+    """
+
+    def __init__(self, budget_mb=DATASET_MEMORY_BUDGET_MB, upload_dir=UPLOAD_DIR):
+        self.budget_bytes = budget_mb * 2 ** 20
+        self.upload_dir = upload_dir
+        self.datasets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, uploaded_file):
+        """Register an upload (once per content) and return its digest."""
+        digest = content_hash(uploaded_file)
+        with self.lock:
+            if digest in self.datasets:
+                self.datasets.move_to_end(digest)
+                return digest
+        path = os.path.join(self.upload_dir, f"{digest}.csv")
+        if not os.path.exists(path):
+            _write_upload(uploaded_file.getvalue(), path)
+        dataset = Dataset(digest, getattr(uploaded_file, 'name', digest[:12]), path)
+        with self.lock:
+            self.datasets.setdefault(digest, dataset)
+            self.datasets.move_to_end(digest)
+        return digest
+
+    def dataset(self, digest):
+        """The dataset for ``digest``, marked as most recently used."""
+        with self.lock:
+            if digest not in self.datasets:
+                raise KeyError(f"dataset {digest[:12]} is not registered; upload it again")
+            self.datasets.move_to_end(digest)
+            return self.datasets[digest]
+
+    def frame(self, digest, schema, prefixes=(), prefix_dtype=None, names=None):
+        df = self.dataset(digest).frame(schema, prefixes, prefix_dtype, names)
+        self._evict(keep=digest)
+        return df
+
+    def list(self, kind=None):
+        """Datasets (of ``kind``, if given), most recently used first."""
+        with self.lock:
+            datasets = list(reversed(self.datasets.values()))
+        return [dataset for dataset in datasets if kind is None or dataset.kind == kind]
+
+    def nbytes(self):
+        with self.lock:
+            return sum(dataset.nbytes for dataset in self.datasets.values())
+
+    def _evict(self, keep):
+        with self.lock:
+            total = sum(dataset.nbytes for dataset in self.datasets.values())
+            for digest, dataset in self.datasets.items():
+                if total <= self.budget_bytes:
+                    break
+                if digest != keep:
+                    # Frames still referenced by a running page stay alive
+                    # until that run ends; the store just stops holding them
+                    total -= dataset.nbytes
+                    dataset.release()
+
+
+@st.cache_resource
+def dataset_store():
+    # One store per server process, shared by every page and session
+    return DatasetStore()
+
+
+def load_dataset(digest, schema, prefixes=(), prefix_dtype=None, names=None):
+    """Frame of a registered dataset, parsed once per distinct schema.
+
+    Only columns named in ``schema`` (plus any starting with one of ``prefixes``)
+    are read. ``names`` reads the first ``len(names)`` columns by position under
+    those names instead of using the file's header.
+    """
+    return dataset_store().frame(digest, schema, tuple(prefixes), prefix_dtype, names)
+
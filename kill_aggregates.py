@@ -0,0 +1,177 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from artifacts import artifact_path
+from data_loader import INTERACTION_SCHEMA, dataset_store, load_dataset
+from player_ids import PlayerCodes
+
+# ==============================
+# ⚔️ Running kill aggregates
+# ==============================
+# Everything the kills dashboard shows can be rendered from a handful of
+# counters keyed by server: kills per attacker, deaths per target, kills per
+# (attacker, target) duel, uses per weapon and rows per server. KillAggregates
+# keeps those counters and can be updated one chunk at a time, so an export is
+# never held in memory as a whole: the counters grow with the number of
+# distinct players, not the number of rows.
+#
+# Players are counted under int32 codes from a PlayerCodes dictionary shared
+# by attackers and targets; callers turn codes into names for display.
+
+# Rows without a server_id still count toward the "All" totals
+MISSING_SERVER = '(no server)'
+
+STREAM_CHUNK_ROWS = 500_000
+
+# Counters written to (and read back from) a precomputed artifact
+COUNTERS = ('attacker_kills', 'target_deaths', 'duels', 'weapon_uses', 'server_totals')
+
+
+def _empty_counts(levels):
+    index = pd.MultiIndex.from_arrays([[] for _ in levels], names=levels)
+    return pd.Series([], index=index, dtype='int64')
+
+
+def _accumulate(total, counts):
+    if total.empty:
+        return counts.astype('int64')
+    return total.add(counts, fill_value=0).astype('int64')
+
+
+def _sum_servers(counts, level, server):
+    if server is not None:
+        if server not in counts.index.get_level_values('server_id'):
+            return counts.iloc[:0].droplevel('server_id')
+        return counts.xs(server, level='server_id')
+    return counts.groupby(level=level, observed=True).sum()
+
+
+class KillAggregates:
+    """Per-server kill counters that can be built incrementally from chunks."""
+
+    def __init__(self):
+        self.attacker_kills = _empty_counts(['server_id', 'distinct_id'])
+        self.target_deaths = _empty_counts(['server_id', 'target_player_id'])
+        self.duels = _empty_counts(['server_id', 'distinct_id', 'target_player_id'])
+        self.weapon_uses = _empty_counts(['server_id', 'item_id'])
+        self.server_totals = pd.Series([], index=pd.Index([], name='server_id'), dtype='int64')
+        self.codes = PlayerCodes()
+        self._players = None
+
+    def update(self, chunk):
+        """Fold one chunk of interaction rows into the running counts."""
+        server = chunk['server_id']
+        if server.isna().any():
+            server = server.astype(object).fillna(MISSING_SERVER)
+
+        keys = pd.DataFrame({
+            'server_id': server,
+            'distinct_id': self.codes.encode(chunk['distinct_id']),
+            'target_player_id': self.codes.encode(chunk['target_player_id']),
+            'item_id': chunk['item_id'],
+        })
+        has_attacker = keys['distinct_id'].to_numpy() >= 0
+        has_target = keys['target_player_id'].to_numpy() >= 0
+
+        def counts(rows, *cols):
+            return keys[rows].groupby(['server_id', *cols], observed=True).size()
+
+        self.attacker_kills = _accumulate(self.attacker_kills, counts(has_attacker, 'distinct_id'))
+        self.target_deaths = _accumulate(self.target_deaths, counts(has_target, 'target_player_id'))
+        self.duels = _accumulate(self.duels, counts(has_attacker & has_target, 'distinct_id', 'target_player_id'))
+        self.weapon_uses = _accumulate(self.weapon_uses, counts(slice(None), 'item_id'))
+        self.server_totals = _accumulate(self.server_totals, server.value_counts(dropna=False).rename_axis('server_id'))
+        self._players = None
+
+    def save(self, path):
+        """Write the counters and player ids to parquet files in ``path``."""
+        for name in COUNTERS:
+            getattr(self, name).rename('count').reset_index().to_parquet(os.path.join(path, f'{name}.parquet'), index=False)
+        pd.DataFrame({'distinct_id': self.codes.ids}).to_parquet(os.path.join(path, 'players.parquet'), index=False)
+
+    @classmethod
+    def load(cls, path):
+        aggregates = cls()
+        for name in COUNTERS:
+            counts = pd.read_parquet(os.path.join(path, f'{name}.parquet'))
+            setattr(aggregates, name, counts.set_index(list(counts.columns[:-1]))['count'].rename(None))
+        aggregates.codes.ids = pd.Index(pd.read_parquet(os.path.join(path, 'players.parquet'))['distinct_id'], dtype=object)
+        return aggregates
+
+    # --- Views (server=None means all servers)
+
+    def servers(self):
+        return sorted(s for s in self.server_totals.index if s != MISSING_SERVER)
+
+    def total_kills(self, server=None):
+        if server is None:
+            return int(self.server_totals.sum())
+        return int(self.server_totals.get(server, 0))
+
+    def kills_by_attacker(self, server=None):
+        return _sum_servers(self.attacker_kills, 'distinct_id', server).sort_values(ascending=False)
+
+    def deaths_by_target(self, server=None):
+        return _sum_servers(self.target_deaths, 'target_player_id', server).sort_values(ascending=False)
+
+    def weapon_counts(self, server=None):
+        return _sum_servers(self.weapon_uses, 'item_id', server).sort_values(ascending=False)
+
+    def duel_counts(self, server=None):
+        """Kills per (attacker, target) pair as a frame with a ``kills`` column."""
+        duels = _sum_servers(self.duels, ['distinct_id', 'target_player_id'], server)
+        return duels.rename('kills').reset_index()
+
+    def players(self):
+        """Codes of every player seen as attacker or target."""
+        # Memoized: the player selectbox asks for this on every rerun
+        if self._players is None:
+            attackers = self.attacker_kills.index.get_level_values('distinct_id')
+            targets = self.target_deaths.index.get_level_values('target_player_id')
+            self._players = np.union1d(attackers, targets).astype(np.int32)
+        return self._players
+
+
+def aggregate_frame(df):
+    aggregates = KillAggregates()
+    aggregates.update(df)
+    return aggregates
+
+
+def aggregate_csv_chunks(source, chunk_rows=STREAM_CHUNK_ROWS):
+    """Build aggregates from CSV bytes (or a CSV path) without materialising
+    the whole file."""
+    aggregates = KillAggregates()
+    reader = pd.read_csv(
+        io.BytesIO(source) if isinstance(source, bytes) else source,
+        usecols=list(INTERACTION_SCHEMA),
+        dtype=INTERACTION_SCHEMA,
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        aggregates.update(chunk)
+    return aggregates
+
+
+@st.cache_resource(show_spinner="Aggregating kills...", max_entries=8)
+def _cached_aggregates(digest, streaming):
+    if streaming:
+        return aggregate_csv_chunks(dataset_store().dataset(digest).path)
+    return aggregate_frame(load_dataset(digest, INTERACTION_SCHEMA))
+
+
+@st.cache_resource(show_spinner="Loading precomputed kills...", max_entries=8)
+def kill_aggregates_artifact(digest):
+    return KillAggregates.load(artifact_path('kills', digest))
+
+
+def load_kill_aggregates(digest, streaming=False):
+    """Return cached aggregates for an uploaded interaction export.
+
+    In streaming mode the CSV is read in chunks and never loaded as a frame.
+    """
+    return _cached_aggregates(digest, streaming)
@@ -0,0 +1,438 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+# ==============================
+# 📍 Kill location helpers
+# ==============================
+# Shared by the 3D kill-location pages (app.py, c8_issues.py).
+
+LOC_COLUMNS = ['properties.loc_x', 'properties.loc_y', 'properties.loc_z']
+
+# ==============================
+# 🔎 Filter index
+# ==============================
+# Built once per dataset from one stable sort per filter column: the sorted row
+# positions, split at each distinct value's offset, are that value's rows in
+# ascending order. Memory is one row position plus one category code per row
+# and column, however many distinct values (servers) there are. A filter
+# combination starts from the shortest selected row list and keeps the rows
+# whose codes match the other selections, so a selectbox change costs one
+# take() on the data instead of a chain of boolean-mask copies.
+
+ALL = 'All'
+FILTER_COLUMNS = ('properties.cause', 'properties.carriage_id', 'properties.server_id')
+FILTER_CACHE_ENTRIES = 64
+
+
+class _ColumnRows:
+    """Row positions of every distinct value of one column."""
+
+    def __init__(self, values):
+        values = values.astype('category')
+        self.codes = values.cat.codes.to_numpy()
+        self.lookup = {value: i for i, value in enumerate(values.cat.categories)}
+        order = np.argsort(self.codes, kind='stable')
+        self.order = order.astype(np.int32) if len(order) < 2 ** 31 else order
+        # Missing values (code -1) sort first
+        counts = np.bincount(self.codes + 1, minlength=len(self.lookup) + 1)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def rows(self, code):
+        return self.order[self.offsets[code + 1]:self.offsets[code + 2]]
+
+
+class FilterIndex:
+    """Per-value row lists for a frame's filter columns."""
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self.columns = {col: _ColumnRows(df[col]) for col in columns if col in df.columns}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def values(self, col):
+        """Sorted distinct values of a filter column (missing values excluded)."""
+        return sorted(self.columns[col].lookup) if col in self.columns else []
+
+    def rows(self, selections):
+        """Row positions matching every ``{column: value}`` selection, or None
+        when nothing is filtered. A value of ALL leaves that column open."""
+        key = tuple(sorted((col, value) for col, value in selections.items() if value != ALL))
+        if not key:
+            return None
+
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        selected = []
+        for col, value in key:
+            column = self.columns.get(col)
+            code = None if column is None else column.lookup.get(value)
+            if code is None:
+                selected = None
+                break
+            selected.append((column, code))
+
+        if selected is None:
+            rows = np.array([], dtype=np.int32)
+        else:
+            selected.sort(key=lambda item: len(item[0].rows(item[1])))
+            (column, code), others = selected[0], selected[1:]
+            rows = column.rows(code)
+            for column, code in others:
+                rows = rows[column.codes[rows] == code]
+
+        with self._lock:
+            self._results[key] = rows
+            while len(self._results) > FILTER_CACHE_ENTRIES:
+                self._results.popitem(last=False)
+        return rows
+
+    def select(self, df, selections):
+        """The rows of ``df`` (the indexed frame) matching ``selections``."""
+        rows = self.rows(selections)
+        return df if rows is None else df.take(rows)
+
+
+@st.cache_resource(max_entries=8, show_spinner="Indexing filters...")
+def filter_index(_df, dataset_key, columns=FILTER_COLUMNS):
+    return FilterIndex(_df, columns)
+
+
+# ==============================
+# 🧊 Voxel level of detail
+# ==============================
+# Past LOD_MIN_POINTS kills, a raw scatter_3d ships every point to the browser.
+# Instead the filtered kills are binned into a resolution³ voxel grid spanning
+# their bounding box (the extent the default camera frames) and each occupied
+# voxel is drawn as one marker at the centroid of its kills, sized by count.
+
+LOD_MIN_POINTS = 20_000
+DEFAULT_VOXEL_RESOLUTION = 48
+
+
+def voxelize(points, resolution=DEFAULT_VOXEL_RESOLUTION, cause_column='properties.cause'):
+    """Aggregate kill points into occupied voxels.
+
+    Returns one row per occupied voxel with the centroid of its kills, the
+    kill count and the most common cause in it.
+    """
+    coords = points[LOC_COLUMNS].to_numpy(dtype=np.float64)
+    # Kills without a finite location can't be placed in a voxel
+    finite = np.isfinite(coords).all(axis=1)
+    if not finite.all():
+        coords, points = coords[finite], points[finite]
+    if len(coords) == 0:
+        return pd.DataFrame(columns=LOC_COLUMNS + ['Kills', 'Dominant Cause'])
+
+    low = coords.min(axis=0)
+    span = np.maximum(coords.max(axis=0) - low, 1e-9)
+    cells = np.minimum(((coords - low) / span * resolution).astype(np.int64), resolution - 1)
+    flat = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+
+    voxels, inverse, counts = np.unique(flat, return_inverse=True, return_counts=True)
+    centroids = np.column_stack([
+        np.bincount(inverse, weights=coords[:, axis], minlength=len(voxels)) / counts
+        for axis in range(3)
+    ])
+
+    causes = points[cause_column].astype('category')
+    cause_codes = causes.cat.codes.to_numpy()
+    n_causes = max(len(causes.cat.categories), 1)
+    # Kills per (voxel, cause); a missing cause (code -1) gets its own column
+    per_cause = np.bincount(
+        inverse * (n_causes + 1) + (cause_codes + 1),
+        minlength=len(voxels) * (n_causes + 1)
+    ).reshape(len(voxels), n_causes + 1)
+    dominant = per_cause[:, 1:].argmax(axis=1)
+
+    voxel_df = pd.DataFrame(centroids.astype(np.float32), columns=LOC_COLUMNS)
+    voxel_df['Kills'] = counts
+    voxel_df['Dominant Cause'] = np.asarray(causes.cat.categories, dtype=object)[dominant] if len(causes.cat.categories) else None
+    return voxel_df
+
+
+@st.cache_data(max_entries=64, show_spinner="Binning kill locations...")
+def cached_voxels(_points, dataset_key, filters, resolution):
+    # One entry per (dataset, filter combination, resolution)
+    return voxelize(_points, resolution)
+
+
+def voxel_figure(voxel_df, color_by='Dominant Cause', title='3D Kill Density (Voxel LOD)'):
+    """One marker per occupied voxel, sized by kill count and colored by the
+    voxel's dominant cause or by its kill count."""
+    fig = px.scatter_3d(
+        voxel_df,
+        x='properties.loc_x', y='properties.loc_y', z='properties.loc_z',
+        color=color_by,
+        size='Kills',
+        size_max=18,
+        color_continuous_scale='Inferno' if color_by == 'Kills' else None,
+        hover_data={'Kills': True, 'Dominant Cause': True},
+        title=title,
+        labels={
+            'properties.loc_x': 'X',
+            'properties.loc_y': 'Y',
+            'properties.loc_z': 'Z',
+        }
+    )
+    fig.update_traces(marker=dict(line_width=0))
+    return fig
+
+
+# ==============================
+# 🌡️ Kill density
+# ==============================
+# A 3D histogram of the filtered kills over their bounding box. Binning is one
+# vectorized pass over the points and is cached per (dataset, filters, bins);
+# the volume and top-down views are drawn from the bin counts alone, so once
+# cached their cost depends on the bin count, not the kill count.
+
+DEFAULT_DENSITY_BINS = 32
+
+
+def density_histogram(points, bins=DEFAULT_DENSITY_BINS):
+    """Kill counts on a bins³ grid. Returns (counts, edges) as np.histogramdd."""
+    coords = points[LOC_COLUMNS].to_numpy(dtype=np.float64)
+    # Kills without a finite location can't be binned (inf breaks histogramdd)
+    coords = coords[np.isfinite(coords).all(axis=1)]
+    if len(coords) == 0:
+        return np.zeros((bins, bins, bins), dtype=np.int64), [np.linspace(0, 1, bins + 1)] * 3
+
+    low, high = coords.min(axis=0), coords.max(axis=0)
+    # A flat axis still needs a non-empty range
+    high = np.where(high > low, high, low + 1)
+    counts, edges = np.histogramdd(coords, bins=bins, range=list(zip(low, high)))
+    return counts.astype(np.int64), edges
+
+
+@st.cache_data(max_entries=64, show_spinner="Binning kill density...")
+def cached_density(_points, dataset_key, filters, bins):
+    # One entry per (dataset, filter combination, bin count)
+    return density_histogram(_points, bins)
+
+
+def _centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
+
+
+def density_volume_figure(counts, edges, title='3D Kill Density'):
+    """Translucent isosurface volume of the kill counts."""
+    X, Y, Z = np.meshgrid(*(_centers(e) for e in edges), indexing='ij')
+    peak = max(int(counts.max()), 1)
+    fig = go.Figure(go.Volume(
+        x=X.ravel(), y=Y.ravel(), z=Z.ravel(),
+        value=counts.ravel(),
+        # Empty space stays invisible
+        isomin=min(1, peak),
+        isomax=peak,
+        opacity=0.15,
+        surface_count=12,
+        colorscale='Inferno',
+        colorbar=dict(title='Kills')
+    ))
+    fig.update_layout(title=title, scene=dict(xaxis_title='X', yaxis_title='Y', zaxis_title='Z'))
+    return fig
+
+
+def density_heatmap_figure(counts, edges, title='Top-Down Kill Density'):
+    """Kill counts summed over Z and drawn as an X/Y heatmap."""
+    top_down = counts.sum(axis=2)
+    fig = go.Figure(go.Heatmap(
+        x=_centers(edges[0]), y=_centers(edges[1]),
+        # Heatmap rows run along y
+        z=np.where(top_down > 0, top_down, np.nan).T,
+        colorscale='Inferno',
+        colorbar=dict(title='Kills'),
+        hovertemplate='X %{x:.1f}, Y %{y:.1f}: %{z} kills<extra></extra>'
+    ))
+    fig.update_layout(title=title, xaxis_title='X', yaxis_title='Y', yaxis_scaleanchor='x')
+    return fig
+
+
+# ==============================
+# ⏱️ Cumulative time-scrub animation
+# ==============================
+# Kills are sorted by time once and frame boundaries are found with
+# searchsorted. Each frame's new kills become their own trace, sent once with
+# the figure; a frame only flips which traces are visible, so scrubbing to
+# frame k shows every kill up to k without resending any points. Past
+# LOD_MIN_POINTS kills the frames animate cumulative counts on a coarse voxel
+# grid instead, so the figure's size depends on the grid and the frame count,
+# not the kill count. Figures are cached per (dataset, filters, frame size).
+
+ANIMATION_BUCKETS = {'Minute': 60, 'Hour': 3600, 'Day': 86400}
+MAX_ANIMATION_FRAMES = 300
+ANIMATION_VOXEL_RESOLUTION = 16
+ANIMATION_VOXEL_SIZE = 14
+
+
+def time_frames(points, bucket_seconds, max_frames=MAX_ANIMATION_FRAMES):
+    """Split kills into cumulative animation frames.
+
+    Returns (order, bounds, labels): ``order`` holds row positions sorted by
+    time, frame k adds ``order[bounds[k]:bounds[k + 1]]`` and ``labels[k]`` is
+    the frame's start time. Empty buckets are skipped; past ``max_frames``
+    neighbouring buckets are merged.
+    """
+    seconds = points['time'].to_numpy(dtype=np.float64)
+    # Mixpanel exports are usually in seconds; some pipelines write ms
+    if len(seconds) and np.nanmax(seconds) > 1e11:
+        seconds = seconds / 1000
+
+    order = np.argsort(seconds, kind='stable')
+    order = order[~np.isnan(seconds[order])]
+    sorted_seconds = seconds[order]
+    if len(order) == 0:
+        return order, np.array([0]), []
+
+    start = np.floor(sorted_seconds[0] / bucket_seconds) * bucket_seconds
+    edges = np.arange(start, sorted_seconds[-1] + bucket_seconds, bucket_seconds)
+    bounds = np.searchsorted(sorted_seconds, edges, side='left')
+    bounds = np.append(bounds, len(order))
+
+    # Keep only buckets that add kills
+    keep = np.flatnonzero(np.diff(bounds) > 0)
+    starts = edges[keep]
+    bounds = np.append(bounds[keep], len(order))
+
+    if len(starts) > max_frames:
+        step = int(np.ceil(len(starts) / max_frames))
+        starts = starts[::step]
+        bounds = np.append(bounds[:-1][::step], len(order))
+
+    labels = pd.to_datetime(starts, unit='s').strftime('%Y-%m-%d %H:%M').tolist()
+    return order, bounds, labels
+
+
+def _animation_layout(fig, labels, coords, title):
+    """Play/pause buttons, a frame slider and axes fixed to the full extent."""
+    def axis(values):
+        return dict(range=[float(np.nanmin(values)), float(np.nanmax(values))]) if len(values) else {}
+
+    fig.update_layout(
+        title=title,
+        scene=dict(xaxis=axis(coords[0]), yaxis=axis(coords[1]), zaxis=axis(coords[2])),
+        updatemenus=[dict(
+            type='buttons',
+            showactive=False,
+            buttons=[
+                dict(label='▶ Play', method='animate', args=[None, dict(frame=dict(duration=300, redraw=True), fromcurrent=True)]),
+                dict(label='⏸ Pause', method='animate', args=[[None], dict(mode='immediate', frame=dict(duration=0, redraw=False))]),
+            ]
+        )],
+        sliders=[dict(
+            currentvalue=dict(prefix='Up to: '),
+            steps=[
+                dict(label=label, method='animate', args=[[label], dict(mode='immediate', frame=dict(duration=0, redraw=True))])
+                for label in labels
+            ]
+        )]
+    )
+    return fig
+
+
+def cumulative_animation_figure(points, order, bounds, labels, title='3D Scatter Plot with Cumulative Time Animation'):
+    """Scatter where frame k shows every kill up to the k-th time bucket."""
+    ordered = points.take(order)
+    causes = ordered['properties.cause'].astype('category')
+    palette = px.colors.qualitative.Plotly
+    cause_colors = {cause: palette[i % len(palette)] for i, cause in enumerate(causes.cat.categories)}
+    point_colors = causes.map(cause_colors).astype(object).fillna('#888').to_numpy()
+    cause_text = causes.astype(object).fillna('Unknown').to_numpy()
+    x, y, z = (ordered[col].to_numpy() for col in LOC_COLUMNS)
+
+    n_frames = len(labels)
+    traces = []
+    for k in range(n_frames):
+        new = slice(bounds[k], bounds[k + 1])
+        traces.append(go.Scatter3d(
+            x=x[new], y=y[new], z=z[new],
+            mode='markers',
+            marker=dict(size=3, color=point_colors[new]),
+            text=cause_text[new],
+            hovertemplate='%{text}<extra></extra>',
+            visible=k == 0,
+            showlegend=False
+        ))
+    # Legend-only entries, one per cause
+    for cause, color in cause_colors.items():
+        traces.append(go.Scatter3d(x=[None], y=[None], z=[None], mode='markers', marker=dict(color=color), name=str(cause)))
+
+    frames = [
+        go.Frame(name=label, data=[go.Scatter3d(visible=i <= k) for i in range(n_frames)], traces=list(range(n_frames)))
+        for k, label in enumerate(labels)
+    ]
+    return _animation_layout(go.Figure(data=traces, frames=frames), labels, (x, y, z), title)
+
+
+def cumulative_voxel_figure(points, order, bounds, labels, resolution=ANIMATION_VOXEL_RESOLUTION,
+                            title='3D Kill Density with Cumulative Time Animation (Voxel LOD)'):
+    """One marker per voxel occupied by the end; frame k sizes and colors each
+    marker by the kills in it up to the k-th time bucket."""
+    coords = points[LOC_COLUMNS].to_numpy(dtype=np.float64)[order]
+    frame = np.repeat(np.arange(len(labels)), np.diff(bounds))
+    finite = np.isfinite(coords).all(axis=1)
+    if not finite.all():
+        coords, frame = coords[finite], frame[finite]
+
+    low = coords.min(axis=0) if len(coords) else np.zeros(3)
+    span = np.maximum(coords.max(axis=0) - low, 1e-9) if len(coords) else np.ones(3)
+    cells = np.minimum(((coords - low) / span * resolution).astype(np.int64), resolution - 1)
+    flat = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+    voxels, inverse = np.unique(flat, return_inverse=True)
+    n_voxels = len(voxels)
+
+    # Markers sit at the centroid of all the voxel's kills, so they stay put
+    # while frames play
+    totals = np.bincount(inverse, minlength=n_voxels)
+    centroids = [
+        np.bincount(inverse, weights=coords[:, axis], minlength=n_voxels) / np.maximum(totals, 1)
+        for axis in range(3)
+    ]
+    # Cumulative kills per (frame, voxel)
+    counts = np.bincount(
+        frame * n_voxels + inverse, minlength=len(labels) * n_voxels
+    ).reshape(len(labels), n_voxels).cumsum(axis=0)
+    peak = max(int(totals.max()) if n_voxels else 0, 1)
+    # Marker area grows with the count; empty voxels get size 0
+    sizes = np.round(ANIMATION_VOXEL_SIZE * np.sqrt(counts / peak), 1)
+
+    def marker(k):
+        return dict(size=sizes[k], color=counts[k], colorscale='Inferno', cmin=0, cmax=peak,
+                    colorbar=dict(title='Kills'), line_width=0)
+
+    trace = go.Scatter3d(
+        x=centroids[0], y=centroids[1], z=centroids[2],
+        mode='markers',
+        marker=marker(0),
+        hovertemplate='%{marker.color} kills<extra></extra>',
+        showlegend=False
+    )
+    frames = [go.Frame(name=label, data=[go.Scatter3d(marker=marker(k))], traces=[0]) for k, label in enumerate(labels)]
+    return _animation_layout(go.Figure(data=[trace], frames=frames), labels, coords.T, title)
+
+
+def animation_figure(points, bucket_seconds):
+    """Cumulative time animation of the kills, or None if none has a time."""
+    order, bounds, labels = time_frames(points, bucket_seconds)
+    if not labels:
+        return None
+    if len(order) > LOD_MIN_POINTS:
+        return cumulative_voxel_figure(points, order, bounds, labels)
+    return cumulative_animation_figure(points, order, bounds, labels)
+
+
+@st.cache_resource(max_entries=16, show_spinner="Building time animation...")
+def cached_animation_figure(_points, dataset_key, filters, bucket_seconds):
+    # One figure per (dataset, filter combination, frame size), reused across
+    # reruns; plotly_chart only serializes it
+    return animation_figure(_points, bucket_seconds)
@@ -0,0 +1,292 @@
+import threading
+from collections import OrderedDict
+
+import networkx as nx
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+from plotly.colors import sample_colorscale
+
+# ==============================
+# 🕸️ Player kill network
+# ==============================
+# The network is built from per-(attacker, target) kill counts rather than
+# from individual kill rows: one weighted edge per pair, with the number of
+# times A killed B stored as the edge's ``kills`` attribute.
+
+EDGE_WEIGHT_BINS = 4
+EDGE_COLORSCALE = 'YlOrRd'
+
+# Above this many edges the figure switches to WebGL and drops the lightest
+# edges beyond HIGH_VOLUME_MAX_EDGES
+HIGH_VOLUME_EDGES = 5_000
+HIGH_VOLUME_MAX_EDGES = 10_000
+
+
+def build_kill_graph(duels):
+    """Build the directed kill graph from a duel table in one call.
+
+    ``duels`` has one row per (distinct_id, target_player_id) pair and a
+    ``kills`` column, as returned by KillAggregates.duel_counts().
+    """
+    return nx.from_pandas_edgelist(
+        duels,
+        source='distinct_id',
+        target='target_player_id',
+        edge_attr='kills',
+        create_using=nx.DiGraph
+    )
+
+
+@st.cache_resource(max_entries=32)
+def cached_kill_graph(_duels, dataset_key, server):
+    # One graph per (dataset, server filter); switching servers back and
+    # forth reuses the graphs already built
+    return build_kill_graph(_duels)
+
+
+def _weight_buckets(weights, bins):
+    # Log scale: a handful of rivalries dominate the kill counts
+    if weights.max() <= 1:
+        return np.zeros(len(weights), dtype=int)
+    scaled = np.log(weights) / np.log(weights.max())
+    return np.minimum((scaled * bins).astype(int), bins - 1)
+
+
+def _positions(G, pos):
+    nodes = list(G)
+    P = np.array([pos[node] for node in nodes], dtype=float).reshape(-1, 2)
+    return nodes, P
+
+
+def _segments(P, src, dst, axis):
+    # x0, x1, NaN per edge: the NaN breaks the line between segments
+    return np.column_stack([P[src, axis], P[dst, axis], np.full(len(src), np.nan)]).ravel()
+
+
+def weighted_edge_traces(G, pos, bins=EDGE_WEIGHT_BINS, max_edges=None, webgl=False):
+    """Return one line trace per kill-volume bucket, wider and hotter for
+    heavier edges (Plotly can't vary width within a single trace).
+
+    ``max_edges`` keeps only the heaviest edges; ``webgl`` draws Scattergl.
+    """
+    if G.number_of_edges() == 0:
+        return []
+
+    nodes, P = _positions(G, pos)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='kills', format='coo')
+    src, dst, weights = A.row, A.col, A.data
+
+    # Decimate: drop the lightest edges once over the cap
+    if max_edges and len(weights) > max_edges:
+        keep = np.argpartition(-weights, max_edges - 1)[:max_edges]
+        src, dst, weights = src[keep], dst[keep], weights[keep]
+
+    buckets = _weight_buckets(weights, bins)
+    colors = sample_colorscale(EDGE_COLORSCALE, [0.3 + 0.7 * b / max(bins - 1, 1) for b in range(bins)])
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    traces = []
+    for bucket in range(bins):
+        members = buckets == bucket
+        if not members.any():
+            continue
+
+        low, high = int(weights[members].min()), int(weights[members].max())
+        traces.append(scatter(
+            x=_segments(P, src[members], dst[members], 0),
+            y=_segments(P, src[members], dst[members], 1),
+            mode='lines',
+            line=dict(width=1 + bucket, color=colors[bucket]),
+            hoverinfo='skip',
+            name=f"{low} kills" if low == high else f"{low}–{high} kills"
+        ))
+    return traces
+
+
+def node_trace(G, pos, labels=None, webgl=False):
+    """Player markers colored by outbound connections. ``labels`` maps
+    player codes to display names. In WebGL mode names move into the hover
+    text; thousands of text labels are what stalls the browser."""
+    nodes, P = _positions(G, pos)
+    text = labels[np.asarray(nodes, dtype=int)] if labels is not None and nodes else nodes
+    out_degree = np.fromiter((d for _, d in G.out_degree(nodes)), dtype=int, count=len(nodes))
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    return scatter(
+        x=P[:, 0], y=P[:, 1],
+        mode='markers' if webgl else 'markers+text',
+        text=text,
+        textposition='top center',
+        hoverinfo='text',
+        showlegend=False,
+        marker=dict(
+            showscale=True,
+            colorscale='YlGnBu',
+            reversescale=True,
+            color=out_degree,
+            size=6 if webgl else 10,
+            colorbar=dict(
+                thickness=15,
+                title='Outbound Connections',
+                xanchor='left'
+            ),
+            line_width=0 if webgl else 1
+        )
+    )
+
+
+def network_figure(G, pos, labels=None, high_volume=False, max_edges=HIGH_VOLUME_MAX_EDGES):
+    """Assemble the kill network figure; ``high_volume`` switches to WebGL
+    traces and caps the number of drawn edges."""
+    edges = weighted_edge_traces(G, pos, max_edges=max_edges if high_volume else None, webgl=high_volume)
+    title = 'Player Kills Network Graph'
+    if high_volume and G.number_of_edges() > max_edges:
+        title += f' (heaviest {max_edges:,} of {G.number_of_edges():,} edges)'
+
+    return go.Figure(data=edges + [node_trace(G, pos, labels=labels, webgl=high_volume)], layout=go.Layout(
+        title=dict(text=title),
+        showlegend=True,
+        legend=dict(title='Kills (A → B)'),
+        hovermode='closest',
+        margin=dict(b=20, l=5, r=5, t=40),
+        xaxis=dict(showgrid=False, zeroline=False),
+        yaxis=dict(showgrid=False, zeroline=False)
+    ))
+
+
+# ==============================
+# 📐 Layout engine
+# ==============================
+# nx.spring_layout compares every pair of nodes on every iteration. Above
+# EXACT_LAYOUT_MAX_NODES we switch to force_layout(): edge attraction runs over
+# a sparse adjacency matrix and repulsion is taken from the centroids of a
+# coarse grid of cells (a one-level Barnes-Hut), so each iteration costs
+# O(edges + nodes * cells). Layouts are cached per dataset under the view that
+# produced the graph (server filter, top-N pruning), and a new graph is
+# warm-started from the positions its nodes had in earlier layouts.
+
+EXACT_LAYOUT_MAX_NODES = 300
+LAYOUT_ITERATIONS = 50
+LAYOUT_GRID = 24
+LAYOUT_CACHE_ENTRIES = 32
+
+
+def force_layout(G, initial=None, iterations=LAYOUT_ITERATIONS, grid=LAYOUT_GRID, seed=42):
+    """Approximate Fruchterman-Reingold layout for large graphs.
+
+    ``initial`` maps nodes to starting positions; nodes missing from it start
+    at random. A warm start begins cooler and runs a third of the iterations,
+    so known nodes stay roughly put.
+    Returns {node: array([x, y])} scaled to [-1, 1] like nx.spring_layout.
+    """
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0:
+        return {}
+
+    rng = np.random.default_rng(seed)
+    P = rng.random((n, 2))
+    warm = False
+    if initial:
+        index = {node: i for i, node in enumerate(nodes)}
+        known = [(index[node], xy) for node, xy in initial.items() if node in index]
+        if known:
+            rows, coords = zip(*known)
+            # Cached layouts live in [-1, 1]; the engine works in the unit square
+            P[list(rows)] = (np.asarray(coords) + 1) / 2
+            warm = True
+
+    # Direction doesn't matter for the layout; attraction acts along each pair once
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format='coo')
+    A = (A + A.T).tocoo()
+    src, dst = A.row, A.col
+
+    k = np.sqrt(1.0 / n)
+    temperature = 0.1
+    if warm:
+        temperature = 0.02
+        iterations = max(10, iterations // 3)
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        disp = np.zeros_like(P)
+
+        # Attraction: d² / k along every edge
+        delta = P[src] - P[dst]
+        dist = np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 0.01)
+        pull = delta * (dist / k)[:, None]
+        disp[:, 0] -= np.bincount(src, weights=pull[:, 0], minlength=n)
+        disp[:, 1] -= np.bincount(src, weights=pull[:, 1], minlength=n)
+
+        # Repulsion: k² / d from each occupied grid cell's centroid, scaled by
+        # how many nodes share the cell
+        low, high = P.min(axis=0), P.max(axis=0)
+        span = np.maximum(high - low, 1e-9)
+        cell_xy = np.minimum(((P - low) / span * grid).astype(int), grid - 1)
+        cell = cell_xy[:, 0] * grid + cell_xy[:, 1]
+        counts = np.bincount(cell, minlength=grid * grid)
+        occupied = np.flatnonzero(counts)
+        cx = np.bincount(cell, weights=P[:, 0], minlength=grid * grid)[occupied] / counts[occupied]
+        cy = np.bincount(cell, weights=P[:, 1], minlength=grid * grid)[occupied] / counts[occupied]
+        centroids = np.column_stack([cx, cy])
+        mass = counts[occupied]
+
+        for start in range(0, n, 4096):
+            block = P[start:start + 4096]
+            delta = block[:, None, :] - centroids[None, :, :]
+            dist2 = np.maximum((delta ** 2).sum(axis=2), 1e-4)
+            disp[start:start + 4096] += (delta * (k * k * mass / dist2)[:, :, None]).sum(axis=1)
+
+        length = np.maximum(np.hypot(disp[:, 0], disp[:, 1]), 0.01)
+        P += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    P = nx.rescale_layout(P)
+    return dict(zip(nodes, P))
+
+
+def prune_top_degree(G, top_n):
+    """Keep only the ``top_n`` players with the most kills + deaths links."""
+    if not top_n or len(G) <= top_n:
+        return G
+    degree = sorted(G.degree, key=lambda item: item[1], reverse=True)
+    return G.subgraph(node for node, _ in degree[:top_n])
+
+
+class LayoutCache:
+    """Layouts keyed by the view that produced each graph, plus the last known
+    position of every node for warm-starting layouts of graphs not seen yet."""
+
+    def __init__(self, max_entries=LAYOUT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.layouts = OrderedDict()
+        self.positions = {}
+        self.lock = threading.Lock()
+
+    def layout(self, G, key):
+        """Layout of ``G``, cached under ``key``: within one dataset the same
+        key must always describe the same graph."""
+        with self.lock:
+            if key in self.layouts:
+                self.layouts.move_to_end(key)
+                return self.layouts[key]
+            seed = {node: self.positions[node] for node in G if node in self.positions}
+
+        if len(G) <= EXACT_LAYOUT_MAX_NODES:
+            pos = nx.spring_layout(G, pos=seed or None, seed=42)
+        else:
+            pos = force_layout(G, initial=seed)
+
+        with self.lock:
+            self.layouts[key] = pos
+            while len(self.layouts) > self.max_entries:
+                self.layouts.popitem(last=False)
+            self.positions.update(pos)
+        return pos
+
+
+@st.cache_resource(max_entries=8)
+def layout_cache(dataset_key):
+    # One cache per dataset, shared by every session viewing it
+    return LayoutCache()
@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy import sparse
+from sklearn.decomposition import IncrementalPCA
+
+from artifacts import artifact_path
+
+# ==============================
+# 🧮 Player event features
+# ==============================
+# The player × event-type feature matrix is kept sparse: players and event
+# types are encoded as categorical codes and the counts go straight into a
+# scipy CSR matrix, so memory tracks the number of non-zero (player, event)
+# pairs rather than players × event types. Only the columns a view actually
+# uses are densified.
+
+ID_COLUMN = 'distinct_id'
+
+# Features clustered on when a page opens (and precomputed offline)
+DEFAULT_FEATURES = ["weapon_used", "syncs_extracted", "building_placed"]
+
+# Rows densified at a time when scaling or projecting features
+FEATURE_BATCH_ROWS = 100_000
+
+
+class EventMatrix:
+    """Sparse player × event-type matrix from a long (distinct_id,
+    event_type, count) table. Same values as
+    ``pivot_table(index='distinct_id', columns='event_type', values='count', fill_value=0)``:
+    repeated (player, event) rows are averaged."""
+
+    def __init__(self, df, value_column='count'):
+        df = df[df[value_column].notna()]
+        players = df[ID_COLUMN].astype('category')
+        events = df['event_type'].astype('category')
+        player_codes = players.cat.codes.to_numpy()
+        event_codes = events.cat.codes.to_numpy()
+        present = (player_codes >= 0) & (event_codes >= 0)
+        player_codes, event_codes = player_codes[present], event_codes[present]
+
+        # Only players and event types that actually occur, in sorted order
+        used_players = np.unique(player_codes)
+        used_events = np.unique(event_codes)
+        self.players = pd.Index(np.asarray(players.cat.categories, dtype=object)[used_players], name=ID_COLUMN)
+        self.event_types = pd.Index(np.asarray(events.cat.categories, dtype=object)[used_events], name='event_type')
+        rows = np.searchsorted(used_players, player_codes)
+        cols = np.searchsorted(used_events, event_codes)
+
+        shape = (len(self.players), len(self.event_types))
+        # coo -> csr sums duplicates; dividing by the number of rows per cell
+        # gives pivot_table's mean
+        totals = sparse.coo_matrix((df[value_column].to_numpy(dtype=np.float64)[present], (rows, cols)), shape=shape).tocsr()
+        counts = sparse.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=shape).tocsr()
+        totals.sort_indices()
+        counts.sort_indices()
+        totals.data /= counts.data
+        totals.eliminate_zeros()
+        self.X = totals
+
+    def save(self, path):
+        """Write the matrix and its player / event-type labels to ``path``."""
+        sparse.save_npz(os.path.join(path, 'events.npz'), self.X)
+        pd.DataFrame({ID_COLUMN: self.players}).to_parquet(os.path.join(path, 'players.parquet'), index=False)
+        pd.DataFrame({'event_type': self.event_types}).to_parquet(os.path.join(path, 'event_types.parquet'), index=False)
+
+    @classmethod
+    def load(cls, path):
+        events = cls.__new__(cls)
+        events.X = sparse.load_npz(os.path.join(path, 'events.npz')).tocsr()
+        events.players = pd.Index(pd.read_parquet(os.path.join(path, 'players.parquet'))[ID_COLUMN], dtype=object, name=ID_COLUMN)
+        events.event_types = pd.Index(
+            pd.read_parquet(os.path.join(path, 'event_types.parquet'))['event_type'], dtype=object, name='event_type'
+        )
+        return events
+
+    def default_features(self):
+        """DEFAULT_FEATURES present in this export, else its first three event types."""
+        event_types = list(self.event_types)
+        return [col for col in DEFAULT_FEATURES if col in event_types] or event_types[:3]
+
+    @property
+    def nnz(self):
+        return self.X.nnz
+
+    def columns(self, event_types, rows=None):
+        """Dense float64 block of the given event types (for a slice of
+        ``rows`` if given); unknown event types are zeros."""
+        X = self.X if rows is None else self.X[rows]
+        codes = self.event_types.get_indexer(pd.Index(event_types, dtype=object))
+        block = np.zeros((X.shape[0], len(codes)))
+        found = codes >= 0
+        if found.any():
+            block[:, found] = X[:, codes[found]].toarray()
+        return block
+
+    def frame(self, event_types, rows=None):
+        """``distinct_id`` plus the given event-type columns as a frame."""
+        players = self.players if rows is None else self.players[rows]
+        frame = pd.DataFrame(self.columns(event_types, rows), columns=list(event_types))
+        frame.insert(0, ID_COLUMN, np.asarray(players, dtype=object))
+        return frame
+
+    def preview(self, n_rows=1000):
+        """The first ``n_rows`` players with every event type, densified."""
+        return self.frame(list(self.event_types), rows=slice(0, n_rows))
+
+    def _batches(self, batch_rows=FEATURE_BATCH_ROWS):
+        for start in range(0, len(self.players), batch_rows):
+            yield slice(start, start + batch_rows)
+
+    def scaled(self, event_types, dtype=np.float32, batch_rows=FEATURE_BATCH_ROWS):
+        """StandardScaler-equivalent features, densified ``batch_rows`` at a
+        time into one ``dtype`` array. Means and variances come from the
+        sparse matrix."""
+        block = self._select(event_types)
+        n = max(block.shape[0], 1)
+        mean = np.asarray(block.mean(axis=0)).ravel()
+        var = np.asarray(block.multiply(block).sum(axis=0)).ravel() / n - mean ** 2
+        scale = np.sqrt(np.maximum(var, 0))
+        # Constant columns are left unscaled, as StandardScaler does
+        scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+
+        out = np.empty(block.shape, dtype=dtype)
+        for rows in self._batches(batch_rows):
+            out[rows] = (block[rows].toarray() - mean) / scale
+        return out
+
+    def _select(self, event_types):
+        codes = self.event_types.get_indexer(pd.Index(event_types, dtype=object))
+        return self.X[:, codes[codes >= 0]].tocsr()
+
+    def group_means(self, labels, event_types):
+        """Mean of each event type per label, from the sparse matrix."""
+        groups, inverse = np.unique(labels, return_inverse=True)
+        membership = sparse.csr_matrix(
+            (np.ones(len(inverse)), (inverse, np.arange(len(inverse)))), shape=(len(groups), len(inverse))
+        )
+        sizes = np.bincount(inverse, minlength=len(groups))
+        block = self._select(event_types)
+        means = (membership @ block).toarray() / sizes[:, None]
+        return groups, sizes, means
+
+
+def project_3d(X, batch_rows=FEATURE_BATCH_ROWS):
+    """First three principal components of ``X``, fitted and transformed in
+    batches. Returns (coordinates, explained variance ratios)."""
+    ipca = IncrementalPCA(n_components=3)
+    for start in range(0, len(X), batch_rows):
+        batch = X[start:start + batch_rows]
+        # partial_fit needs at least n_components rows; a shorter tail only gets transformed
+        if len(batch) >= 3:
+            ipca.partial_fit(batch)
+    coords = np.empty((len(X), 3), dtype=np.float32)
+    for start in range(0, len(X), batch_rows):
+        coords[start:start + batch_rows] = ipca.transform(X[start:start + batch_rows])
+    return coords, ipca.explained_variance_ratio_
+
+
+@st.cache_resource(max_entries=8, show_spinner="Building player feature matrix...")
+def event_matrix(_df, dataset_key):
+    return EventMatrix(_df)
+
+
+@st.cache_resource(max_entries=8, show_spinner="Loading precomputed player features...")
+def event_matrix_artifact(digest):
+    return EventMatrix.load(artifact_path('events', digest))
+
+
+@st.cache_resource(max_entries=8, show_spinner="Scaling features...")
+def scaled_features(_events, dataset_key, event_types):
+    return _events.scaled(list(event_types))
+
+
+@st.cache_resource(max_entries=8, show_spinner="Projecting features to 3D...")
+def cached_projection(_X, feature_key):
+    return project_3d(_X)
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ==============================
+# 🪪 Player identity
+# ==============================
+# Mixpanel ids are 32-char hex strings. Attackers and targets are encoded into
+# one shared int32 code space so groupbys, matrices and graphs work on small
+# integers, and names are looked up only when something is displayed.
+
+# distinct_id -> display name; two columns, distinct_id and name
+PLAYER_NAMES_FILE = os.environ.get(
+    'PLAYER_NAMES_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'player_names.csv')
+)
+
+MISSING_CODE = -1
+
+
+@st.cache_data
+def load_player_names(path=PLAYER_NAMES_FILE):
+    """Read the id -> name mapping once; a missing file just means no names."""
+    if not os.path.exists(path):
+        return {}
+    names = pd.read_csv(path, dtype=str).dropna()
+    return dict(zip(names['distinct_id'], names['name']))
+
+
+class PlayerCodes:
+    """Growing dictionary from player id to int32 code.
+
+    Codes are assigned in first-seen order, so chunks can be encoded one after
+    another and earlier codes never change.
+    """
+
+    def __init__(self):
+        self.ids = pd.Index([], dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _codes_for(self, ids):
+        codes = self.ids.get_indexer(ids)
+        new = codes < 0
+        if new.any():
+            codes[new] = np.arange(len(self.ids), len(self.ids) + new.sum())
+            self.ids = self.ids.append(pd.Index(ids[new], dtype=object))
+        return codes.astype(np.int32)
+
+    def encode(self, values):
+        """Return int32 codes for a column of ids; missing ids become -1.
+
+        Only the column's distinct values are looked up.
+        """
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        category_codes = self._codes_for(np.asarray(values.cat.categories, dtype=object))
+        row_codes = values.cat.codes.to_numpy()
+        if len(category_codes) == 0:
+            return np.full(len(row_codes), MISSING_CODE, dtype=np.int32)
+        return np.where(row_codes >= 0, category_codes[row_codes], MISSING_CODE).astype(np.int32)
+
+    def labels(self, names):
+        """Display label for every code: the mapped name, else the raw id."""
+        ids = pd.Series(self.ids, dtype=object)
+        return ids.map(names).fillna(ids).to_numpy(dtype=object)
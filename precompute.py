@@ -0,0 +1,124 @@
+"""Precompute dashboard aggregates for a directory of exports.
+
+    python precompute.py exports/                  # every *.csv, one process per core
+    python precompute.py exports/ --jobs 2 --force
+
+Each export's kind is read from its header:
+
+    kills   player interactions (killsapp.py): kill counters per server
+    shop    knowledge_granted exports (shop_app.py): ownership matrix and
+            first acquisitions
+    events  event-count exports (3d_player_types.py): player feature matrix
+            and the KMeans sweep over the default features
+
+Artifacts go to ARTIFACT_DIR/<kind>/<sha256 of the file>, where the dashboards
+find them. Exports that already have an artifact are skipped unless --force.
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from acquisition_rollups import FIRSTS_FILE, first_acquisitions
+from artifacts import ARTIFACT_DIR, has_artifact, write_artifact
+from blueprint_ownership import OwnershipMatrix
+from data_loader import EVENT_COUNT_NAMES, EVENT_COUNT_SCHEMA, SHOP_PREFIXES, SHOP_SCHEMA, export_kind, parse_csv
+from kill_aggregates import aggregate_csv_chunks
+from player_clustering import KMEANS_K_RANGE, MINIBATCH_MIN_PLAYERS, fit_kmeans, save_kmeans_fits
+from player_features import EventMatrix
+
+
+def build_kills(csv_path):
+    aggregates = aggregate_csv_chunks(csv_path)
+    return aggregates.save, aggregates.total_kills()
+
+
+def build_shop(csv_path):
+    df = parse_csv(csv_path, SHOP_SCHEMA, SHOP_PREFIXES, prefix_dtype='category')
+    ownership = OwnershipMatrix(df)
+    firsts = None
+    if 'time' in df.columns:
+        firsts = first_acquisitions(df)
+
+    def save(path):
+        ownership.save(path)
+        if firsts is not None:
+            firsts.to_parquet(os.path.join(path, FIRSTS_FILE), index=False)
+    return save, len(df)
+
+
+def build_events(csv_path):
+    df = parse_csv(csv_path, EVENT_COUNT_SCHEMA, names=EVENT_COUNT_NAMES)
+    events = EventMatrix(df)
+    features = events.default_features()
+    fits = []
+    if features and len(events.players) > max(KMEANS_K_RANGE):
+        X = events.scaled(features)
+        minibatch = len(X) >= MINIBATCH_MIN_PLAYERS
+        fits = [fit_kmeans(X, k, minibatch) for k in KMEANS_K_RANGE]
+
+    def save(path):
+        events.save(path)
+        if fits:
+            save_kmeans_fits(path, fits, features, minibatch)
+    return save, len(df)
+
+
+BUILDERS = {
+    'kills': build_kills,
+    'shop': build_shop,
+    'events': build_events,
+}
+
+
+def precompute_file(path, root=ARTIFACT_DIR, force=False):
+    """Build one export's artifact; returns (path, kind, status, seconds)."""
+    start = time.perf_counter()
+    kind = export_kind(pd.read_csv(path, nrows=0).columns)
+    if kind not in BUILDERS:
+        return path, kind, 'skipped: nothing to precompute', 0.0
+
+    # Hashed in blocks and read by path, so an export is never held in memory whole
+    with open(path, 'rb') as f:
+        digest = hashlib.file_digest(f, 'sha256').hexdigest()
+    if not force and has_artifact(kind, digest, root):
+        return path, kind, 'up to date', time.perf_counter() - start
+
+    save, rows = BUILDERS[kind](path)
+    write_artifact(kind, digest, save, {'source': os.path.basename(path), 'rows': int(rows)}, root)
+    return path, kind, f'built ({rows:,} rows)', time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', help='directory of CSV exports')
+    parser.add_argument('--out', default=ARTIFACT_DIR, help='artifact directory the dashboards read')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='exports processed in parallel')
+    parser.add_argument('--force', action='store_true', help='rebuild artifacts that already exist')
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(args.directory, '*.csv')))
+    if not paths:
+        parser.error(f'no CSV files in {args.directory}')
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(paths)))) as pool:
+        futures = {pool.submit(precompute_file, path, args.out, args.force): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                path, kind, status, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f'{os.path.basename(futures[future])}: FAILED {e!r}', file=sys.stderr, flush=True)
+                continue
+            print(f'{os.path.basename(path)}: {kind or "-"} {status} in {seconds:.1f}s', flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy import sparse
+
+# ==============================
+# 🔥 Rivalry engine
+# ==============================
+# Kill counts live in a sparse attacker × target matrix K over the int32 player
+# codes from player_ids, so K[a, b] is how many times a killed b. A pair is a rivalry when both
+# directions are non-zero, i.e. where K ∘ Kᵀ (elementwise) is non-zero, and
+# each unordered pair is kept once under its canonical (min, max) code order.
+#
+# The same matrices double as the per-player index for the breakdown panel:
+# K in CSR form is the duel table sorted by attacker with an offset table
+# (indptr), and Kᵀ in CSR form is the one sorted by target. Looking up one
+# player costs time proportional to that player's own opponents.
+
+
+class RivalryMatrix:
+    """Sparse pairwise kill counts built from a coded duel table
+    (``distinct_id``, ``target_player_id``, ``kills``).
+
+    Results report players by code; ``n_players`` is the size of the code
+    space (defaults to the largest code seen + 1).
+    """
+
+    def __init__(self, duels, n_players=None):
+        attackers = duels['distinct_id'].to_numpy(dtype=np.int64)
+        targets = duels['target_player_id'].to_numpy(dtype=np.int64)
+        if n_players is None:
+            n_players = int(max(attackers.max(initial=-1), targets.max(initial=-1))) + 1
+
+        self.n_players = n_players
+        # coo -> csr sums any repeated pairs
+        self.K = sparse.coo_matrix(
+            (duels['kills'].to_numpy(dtype=np.int64), (attackers, targets)), shape=(n_players, n_players)
+        ).tocsr()
+        self.KT = self.K.T.tocsr()
+
+    def _code(self, player):
+        return player if 0 <= player < self.n_players else None
+
+    def _row(self, matrix, code):
+        start, end = matrix.indptr[code], matrix.indptr[code + 1]
+        return matrix.indices[start:end], matrix.data[start:end]
+
+    def kills_of(self, player):
+        """Who ``player`` killed and how often, most killed first."""
+        code = self._code(player)
+        if code is None:
+            return pd.DataFrame(columns=['Target', 'Times Killed'])
+        targets, kills = self._row(self.K, code)
+        order = np.argsort(-kills, kind='stable')
+        return pd.DataFrame({'Target': targets[order], 'Times Killed': kills[order]})
+
+    def deaths_of(self, player):
+        """Who killed ``player`` and how often, most frequent first."""
+        code = self._code(player)
+        if code is None:
+            return pd.DataFrame(columns=['Attacker', 'Times Killed By'])
+        attackers, deaths = self._row(self.KT, code)
+        order = np.argsort(-deaths, kind='stable')
+        return pd.DataFrame({'Attacker': attackers[order], 'Times Killed By': deaths[order]})
+
+    def rivalries(self):
+        """Every mutual pair once, with kills in each direction, total and net."""
+        mutual = self.K.multiply(self.KT).tocoo()
+        a = np.minimum(mutual.row, mutual.col)
+        b = np.maximum(mutual.row, mutual.col)
+        keep = mutual.row == a
+        a, b = a[keep], b[keep]
+
+        a_to_b = np.asarray(self.K[a, b]).ravel()
+        b_to_a = np.asarray(self.K[b, a]).ravel()
+        return pd.DataFrame({
+            'Player A': a,
+            'Player B': b,
+            'A → B Kills': a_to_b,
+            'B → A Kills': b_to_a,
+            'Total Kills': a_to_b + b_to_a,
+            'Net Score': a_to_b - b_to_a,
+        })
+
+    def top_rivalries(self, n=20):
+        return self.rivalries().nlargest(n, 'Total Kills').reset_index(drop=True)
+
+    def player_rivalries(self, player):
+        """Mutual kill exchanges for one player, best net result first."""
+        code = self._code(player)
+        if code is None:
+            return pd.DataFrame(columns=['Target', 'Times Killed', 'Times Killed By', 'Net Kills'])
+
+        targets, kills = self._row(self.K, code)
+        attackers, deaths = self._row(self.KT, code)
+        mutual, in_kills, in_deaths = np.intersect1d(targets, attackers, assume_unique=True, return_indices=True)
+        times_killed = kills[in_kills]
+        times_killed_by = deaths[in_deaths]
+
+        rivalries = pd.DataFrame({
+            'Target': mutual,
+            'Times Killed': times_killed,
+            'Times Killed By': times_killed_by,
+            'Net Kills': times_killed - times_killed_by,
+        })
+        return rivalries.sort_values(by='Net Kills', ascending=False).reset_index(drop=True)
+
+
+@st.cache_resource(max_entries=32)
+def cached_rivalry_matrix(_duels, n_players, dataset_key, server):
+    return RivalryMatrix(_duels, n_players)
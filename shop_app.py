@@ -1,17 +1,26 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
 
-st.title("Shop Data")
+from acquisition_rollups import acquisition_store, first_acquisitions_artifact
+from artifacts import export_source
+from blueprint_ownership import ownership_artifact, ownership_matrix
+from data_loader import SHOP_PREFIXES, SHOP_SCHEMA, load_dataset
+from stage_timing import stage, start_page, timings_panel
 
-# Upload CSV
-uploaded_file = st.file_uploader("Choose a Mixpanel CSV file", type="csv")
+st.title("Shop Data")
+start_page('shop_app')
 
-if uploaded_file:
-    df = pd.read_csv(uploaded_file)
+# Shop export: shared by another page or session, precomputed by
+# precompute.py, or uploaded here
+dataset_key, precomputed = export_source('shop', "Choose a Mixpanel CSV file", type="csv")
 
-    if 'time' in df.columns:
-        df['datetime'] = pd.to_datetime(df['time'], unit='ms')
+if dataset_key:
+    # A precomputed export is never parsed: everything below renders from its
+    # ownership matrix and first acquisitions
+    df = None
+    if not precomputed:
+        with stage('read_csv: shop') as s:
+            df = s.rows_out = load_dataset(dataset_key, SHOP_SCHEMA, prefixes=SHOP_PREFIXES, prefix_dtype='category')
 
     # Define blueprint groups
     weapon_items = [
@@ -61,24 +70,15 @@ if uploaded_file:
         "Exchange.Blueprint.Weapon.Rifle_T3_Reskin",
     ]
 
-    # Get knowledge columns and melt to long format
-    knowledge_columns = [col for col in df.columns if col.startswith("properties.knowledge_granted.")]
-    melted_df = df.melt(id_vars=["distinct_id"], value_vars=knowledge_columns, value_name="Blueprint").dropna()
-    unique_grants = melted_df.drop_duplicates(subset=["distinct_id", "Blueprint"])
-
-    # Generic function to count distinct_id per blueprint
-    def count_group(group_items):
-        filtered = unique_grants[unique_grants["Blueprint"].isin(group_items)]
-        return (
-            filtered.groupby("Blueprint")["distinct_id"]
-            .nunique()
-            .reset_index()
-            .rename(columns={"distinct_id": "Count"})
-        )
+    # Player × blueprint ownership, built once per upload
+    with stage('ownership matrix', df) as s:
+        ownership = ownership_artifact(dataset_key) if precomputed else ownership_matrix(df, dataset_key)
+        s.rows_out = len(ownership.players)
 
     # Create and plot each section
     def show_chart(title, items):
-        data = count_group(items)
+        with stage(f'blueprint counts: {title}', len(ownership.players)) as s:
+            data = s.rows_out = ownership.counts(items)
         st.subheader(title)
         st.dataframe(data)
         fig = px.bar(
@@ -101,32 +101,25 @@ if uploaded_file:
     shop_items = weapon_items + cosmetic_items + base_items
 
     # Get players who received any shop item
-    shop_spenders = unique_grants[unique_grants["Blueprint"].isin(shop_items)]["distinct_id"].unique()
+    with stage('shop spenders', len(ownership.players)) as s:
+        shop_spenders = s.rows_out = ownership.owners_of_any(shop_items)
 
     # Display total shop spenders
     st.header("Shop Spend Summary")
     st.markdown(f"**Total players who acquired at least one item from the shop: {len(shop_spenders)}**")
 
     st.markdown("**Player IDs:**")
-    st.write(shop_spenders.tolist())
+    st.write(shop_spenders)
 
     # Battle Pass Section
     st.header("Battle Pass")
 
-    def count_bp_page(items, page_name):
-        df_page = count_group(items)
-        df_page["Page"] = page_name
-        return df_page
-
-    bp1_df = count_bp_page(bp_page_1, "Page 1")
-    bp2_df = count_bp_page(bp_page_2, "Page 2")
-    bp3_df = count_bp_page(bp_page_3, "Page 3")
-    bp_df = pd.concat([bp1_df, bp2_df, bp3_df], ignore_index=True)
-
     for page, items in [("Page 1", bp_page_1), ("Page 2", bp_page_2), ("Page 3", bp_page_3)]:
-        # Filter and count unique acquisitions
-        page_df = count_group(items)
-        page_df["Page"] = page
+        # Count unique acquisitions, and the players who have every
+        # blueprint on this page
+        with stage(f'page completions: {page}', len(ownership.players)) as s:
+            page_df = ownership.counts(items)
+            full_owners = s.rows_out = ownership.owners_of_all(items)
 
         # Plot
         st.subheader(f"Battle Pass {page}")
@@ -141,16 +134,56 @@ if uploaded_file:
         fig.update_layout(xaxis_tickangle=-45)
         st.plotly_chart(fig)
 
-          # Get players who have all the blueprints on this page
-        all_items_df = (
-            unique_grants[unique_grants["Blueprint"].isin(items)]
-            .groupby("distinct_id")["Blueprint"]
-            .nunique()
-            .reset_index()
-        )
-        full_owners = all_items_df[all_items_df["Blueprint"] == len(items)]["distinct_id"]
-
         # Display count and IDs
         st.markdown(f"**Players who acquired all {len(items)} rewards on {page}: {len(full_owners)}**")
         st.markdown("**Player IDs:**")
-        st.write(full_owners.tolist())
+        st.write(full_owners)
+
+    # Acquisitions over time, from the local store of daily rollups. Each
+    # export is merged in once; earlier exports don't need re-uploading.
+    firsts = first_acquisitions_artifact(dataset_key) if precomputed else None
+    if firsts is not None or (df is not None and 'time' in df.columns):
+        st.header("Acquisitions Over Time")
+        store = acquisition_store()
+        with stage('ingest rollups', df if firsts is None else firsts) as s:
+            changed = s.rows_out = store.ingest(dataset_key, df, firsts)
+        if changed:
+            st.caption(f"Merged {changed:,} new first acquisitions into the rollup store")
+        st.caption(f"Rollup store: {len(store.firsts):,} first acquisitions from {len(store.ingested)} export(s)")
+
+        acquisition_groups = {
+            "Weapons": weapon_items,
+            "Cosmetics": cosmetic_items,
+            "Base": base_items,
+            "Battle Pass Page 1": bp_page_1,
+            "Battle Pass Page 2": bp_page_2,
+            "Battle Pass Page 3": bp_page_3,
+        }
+
+        # A fragment over the store: switching group or view only redraws this chart
+        @st.fragment
+        def acquisitions_chart(store, acquisition_groups):
+            selected_group = st.selectbox("Blueprint group", list(acquisition_groups))
+            cumulative = st.radio("Show", ["Cumulative", "Daily"], horizontal=True) == "Cumulative"
+
+            with stage('daily acquisitions') as s:
+                daily = s.rows_out = store.daily_acquisitions(acquisition_groups[selected_group])
+            if daily.empty:
+                st.info(f"No acquisitions recorded for {selected_group} yet.")
+            else:
+                if cumulative:
+                    daily = daily.cumsum()
+                fig = px.line(
+                    daily.reset_index().melt(id_vars="day", var_name="Blueprint", value_name="Players"),
+                    x="day",
+                    y="Players",
+                    color="Blueprint",
+                    markers=True,
+                    title=f"{selected_group} - {'Cumulative' if cumulative else 'New'} Unique Player Acquisitions",
+                    labels={"day": "Day", "Players": "Unique Players"}
+                )
+                st.plotly_chart(fig)
+
+        acquisitions_chart(store, acquisition_groups)
+
+timings_panel()
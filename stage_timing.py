@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from data_loader import SIDECAR_DIR
+
+# ==============================
+# ⏱️ Stage timings
+# ==============================
+# Pages wrap their expensive steps in `with stage(name, rows_in):` blocks.
+# Each block records wall time, rows in/out and the change in the process's
+# resident memory. Records are kept for the current script run (shown by the
+# optional sidebar panel) and appended as JSON lines to STAGE_LOG_PATH, so hot
+# paths on the shared analysis box can be tracked over time. Setting
+# DASHBOARD_STAGE_LOG to an empty string turns the file off.
+#
+# A fragment rerun (st.fragment) repeats only its own stages: they replace
+# the records of the same name from the last full run, so the panel keeps one
+# row per stage. The panel itself refreshes on the next full rerun.
+
+STAGE_LOG_PATH = os.environ.get('DASHBOARD_STAGE_LOG', os.path.join(SIDECAR_DIR, 'stage_timings.jsonl'))
+
+_STATE_KEY = '_stage_timings'
+_log_lock = threading.Lock()
+
+
+def _rss_mb():
+    # Current (not peak) resident memory; Linux only, None elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _row_count(rows):
+    """Rows of a frame, array, sparse matrix or graph; ints pass through."""
+    if rows is None or isinstance(rows, int):
+        return rows
+    if hasattr(rows, 'shape'):
+        return int(rows.shape[0])
+    if hasattr(rows, 'number_of_nodes'):
+        return rows.number_of_nodes()
+    return len(rows)
+
+
+class StageRecord:
+    """One timed stage. Set ``rows_out`` inside the block."""
+
+    def __init__(self, page, name, rows_in=None):
+        self.page = page
+        self.name = name
+        self.rows_in = _row_count(rows_in)
+        self.rows_out = None
+        self.seconds = None
+        self.memory_delta_mb = None
+
+    def as_dict(self):
+        return {
+            'page': self.page,
+            'stage': self.name,
+            'seconds': self.seconds,
+            'rows_in': self.rows_in,
+            'rows_out': _row_count(self.rows_out),
+            'memory_delta_mb': self.memory_delta_mb,
+        }
+
+
+def _append_log(record):
+    if not STAGE_LOG_PATH:
+        return
+    line = json.dumps({'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), **record.as_dict()})
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(STAGE_LOG_PATH) or '.', exist_ok=True)
+            with open(STAGE_LOG_PATH, 'a') as f:
+                f.write(line + '\n')
+    except OSError:
+        # A read-only or full disk must never break the dashboard
+        pass
+
+
+def _keep(records, record):
+    for i, kept in enumerate(records):
+        if kept.name == record.name:
+            records[i] = record
+            return
+    records.append(record)
+
+
+def start_page(page):
+    """Begin a script run's timings; call once at the top of each page."""
+    st.session_state[_STATE_KEY] = {'page': page, 'stages': []}
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Time the enclosed block as stage ``name`` of the current page."""
+    run = st.session_state.get(_STATE_KEY)
+    record = StageRecord(run['page'] if run else None, name, rows_in)
+    memory_before = _rss_mb()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = round(time.perf_counter() - start, 6)
+        memory_after = _rss_mb()
+        if memory_before is not None and memory_after is not None:
+            record.memory_delta_mb = round(memory_after - memory_before, 2)
+        if run is not None:
+            _keep(run['stages'], record)
+        _append_log(record)
+
+
+def stage_timings():
+    """This run's stages so far as a frame."""
+    run = st.session_state.get(_STATE_KEY)
+    records = [record.as_dict() for record in run['stages']] if run else []
+    timings = pd.DataFrame(records, columns=['stage', 'seconds', 'rows_in', 'rows_out', 'memory_delta_mb'])
+    return timings.astype({'rows_in': 'Int64', 'rows_out': 'Int64'})
+
+
+def timings_panel():
+    """Optional sidebar table of this run's stages; call at the end of a page."""
+    if st.sidebar.checkbox("⏱️ Show stage timings", key='show_stage_timings'):
+        timings = stage_timings()
+        st.sidebar.caption(f"{timings['seconds'].sum():.3f}s across {len(timings)} stages")
+        st.sidebar.dataframe(timings, hide_index=True, use_container_width=True)
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from acquisition_rollups import AcquisitionStore, _daily_counts, first_acquisitions
+from benchmarks.generators import shop
+
+DAY_MS = 86_400_000
+
+
+def export(n_rows, seed, shift_days=0):
+    df = pd.concat(shop(n_rows, seed), ignore_index=True)
+    df['time'] = df['time'] - shift_days * DAY_MS
+    return df
+
+
+@pytest.fixture
+def exports():
+    first = export(2_000, seed=0)
+    # Same players, dated before the first export
+    earlier = export(2_000, seed=1, shift_days=10)
+    # Half of the first export again plus new rows
+    overlapping = pd.concat([first.iloc[::2], export(500, seed=2, shift_days=3)], ignore_index=True)
+    return {'first': first, 'earlier': earlier, 'overlapping': overlapping}
+
+
+def expected_daily(frames):
+    return _daily_counts(first_acquisitions(pd.concat(frames, ignore_index=True))).sort_index()
+
+
+def assert_daily_equal(store, frames):
+    pd.testing.assert_series_equal(store.daily.sort_index(), expected_daily(frames), check_names=False, check_dtype=False)
+
+
+def test_incremental_ingest_matches_full_recompute(tmp_path, exports):
+    store = AcquisitionStore(str(tmp_path))
+    for digest, df in exports.items():
+        assert store.ingest(digest, df) > 0
+    assert_daily_equal(store, exports.values())
+
+    reopened = AcquisitionStore(str(tmp_path))
+    assert_daily_equal(reopened, exports.values())
+    assert reopened.ingested == set(exports)
+    pd.testing.assert_frame_equal(
+        reopened.firsts.sort_values(['distinct_id', 'Blueprint']).reset_index(drop=True),
+        store.firsts.sort_values(['distinct_id', 'Blueprint']).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_reingesting_an_export_is_a_no_op(tmp_path, exports):
+    store = AcquisitionStore(str(tmp_path))
+    store.ingest('first', exports['first'])
+    daily = store.daily.copy()
+
+    assert store.ingest('first', exports['first']) == 0
+    pd.testing.assert_series_equal(store.daily, daily)
+    assert AcquisitionStore(str(tmp_path)).ingest('first', exports['first']) == 0
+
+
+def test_precomputed_firsts_match_raw_export(tmp_path, exports):
+    from_raw = AcquisitionStore(str(tmp_path / 'raw'))
+    from_firsts = AcquisitionStore(str(tmp_path / 'firsts'))
+    for digest, df in exports.items():
+        from_raw.ingest(digest, df)
+        from_firsts.ingest(digest, firsts=first_acquisitions(df))
+    pd.testing.assert_series_equal(from_raw.daily, from_firsts.daily)
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generators import BLUEPRINTS, shop
+from blueprint_ownership import OwnershipMatrix, knowledge_columns
+
+ITEM_GROUPS = [
+    BLUEPRINTS[:4],
+    BLUEPRINTS[4:9],
+    BLUEPRINTS[-3:],
+    # One item nobody was granted
+    BLUEPRINTS[:2] + ['Exchange.Blueprint.Never.Granted'],
+]
+
+
+@pytest.fixture(scope='module')
+def export():
+    return pd.concat(shop(3_000), ignore_index=True)
+
+
+@pytest.fixture(scope='module')
+def unique_grants(export):
+    # The melt + drop_duplicates shop_app.py used before
+    melted = export.melt(id_vars=['distinct_id'], value_vars=knowledge_columns(export), value_name='Blueprint').dropna()
+    return melted.drop_duplicates(subset=['distinct_id', 'Blueprint'])
+
+
+@pytest.mark.parametrize('items', ITEM_GROUPS)
+def test_counts_match_melt_groupby(export, unique_grants, items):
+    expected = (
+        unique_grants[unique_grants['Blueprint'].isin(items)]
+        .groupby('Blueprint', observed=True)['distinct_id']
+        .nunique()
+        .reset_index()
+        .rename(columns={'distinct_id': 'Count'})
+    )
+    pd.testing.assert_frame_equal(OwnershipMatrix(export).counts(items), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('items', ITEM_GROUPS)
+def test_owners_match_melt_groupby(export, unique_grants, items):
+    ownership = OwnershipMatrix(export)
+    owned = unique_grants[unique_grants['Blueprint'].isin(items)]
+    any_owners = owned['distinct_id'].unique()
+    per_player = owned.groupby('distinct_id', observed=True)['Blueprint'].nunique()
+    all_owners = per_player[per_player == len(items)].index
+
+    assert sorted(ownership.owners_of_any(items)) == sorted(any_owners)
+    assert sorted(ownership.owners_of_all(items)) == sorted(all_owners)
+
+
+def test_saved_matrix_round_trips(tmp_path, export):
+    ownership = OwnershipMatrix(export)
+    ownership.save(str(tmp_path))
+    loaded = OwnershipMatrix.load(str(tmp_path))
+    for items in ITEM_GROUPS:
+        pd.testing.assert_frame_equal(loaded.counts(items), ownership.counts(items))
+        assert loaded.owners_of_all(items) == ownership.owners_of_all(items)
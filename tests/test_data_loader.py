@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+import data_loader
+
+BLANK_INTERACTIONS = (
+    "distinct_id,target_player_id,server_id,item_id\n"
+    "a,b,s1,rifle\n"
+    "b,,s1,\n"
+    "c,a,,knife\n"
+    "a,NA,s2,rifle\n"
+)
+
+BLANK_SHOP = (
+    "distinct_id,time,properties.knowledge_granted.0,properties.knowledge_granted.1\n"
+    "a,1700000000,wall,\n"
+    "b,1700000100,,door\n"
+    ",1700000200,wall,door\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def sidecar_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, 'SIDECAR_DIR', str(tmp_path))
+
+
+@pytest.mark.parametrize('raw, schema, prefixes, prefix_dtype', [
+    (BLANK_INTERACTIONS, data_loader.INTERACTION_SCHEMA, (), None),
+    (BLANK_SHOP, data_loader.SHOP_SCHEMA, data_loader.SHOP_PREFIXES, 'category'),
+], ids=['interactions', 'shop'])
+def test_sidecar_matches_pandas_on_blank_cells(tmp_path, raw, schema, prefixes, prefix_dtype):
+    path = tmp_path / 'export.csv'
+    path.write_text(raw)
+
+    expected = data_loader.parse_csv(str(path), schema, prefixes, prefix_dtype)
+    written = data_loader._parse_dataset(str(path), 'digest', schema, prefixes, prefix_dtype, None)
+    mapped = data_loader._parse_dataset(str(path), 'digest', schema, prefixes, prefix_dtype, None)
+
+    for df in (written, mapped):
+        assert df.isna().equals(expected.isna())
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False, check_categorical=False)
@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import DBSCAN
+from sklearn.datasets import make_blobs
+from sklearn.preprocessing import StandardScaler
+
+from benchmarks.generators import events
+from data_loader import EVENT_COUNT_NAMES
+from player_clustering import DBSCANEngine, affordable_radius, dbscan_blocks
+from player_features import EventMatrix
+
+EPS_GRID = [0.1, 0.2, 0.35, 0.5, 0.8, 1.2, 2.0]
+MIN_SAMPLES_GRID = [1, 2, 5, 10]
+
+
+@pytest.fixture(scope='module')
+def X():
+    points, _ = make_blobs(n_samples=600, n_features=4, centers=5, cluster_std=[0.5, 1.0, 1.5, 0.8, 2.5], random_state=0)
+    # Scattered points between the blobs give noise and border points
+    noise = np.random.default_rng(0).uniform(points.min(axis=0), points.max(axis=0), size=(150, 4))
+    return StandardScaler().fit_transform(np.vstack([points, noise])).astype(np.float32)
+
+
+@pytest.fixture(scope='module')
+def graph_engine(X):
+    return DBSCANEngine(X, reuse_graph=True)
+
+
+@pytest.mark.parametrize('min_samples', MIN_SAMPLES_GRID)
+@pytest.mark.parametrize('eps', EPS_GRID)
+def test_graph_labels_match_sklearn(X, graph_engine, eps, min_samples):
+    expected = DBSCAN(eps=eps, min_samples=min_samples).fit_predict(X)
+    np.testing.assert_array_equal(graph_engine.labels(eps, min_samples), expected)
+    assert graph_engine.graph is not None
+
+
+@pytest.mark.parametrize('min_samples', MIN_SAMPLES_GRID)
+@pytest.mark.parametrize('eps', EPS_GRID)
+def test_block_labels_match_sklearn(X, eps, min_samples):
+    expected = DBSCAN(eps=eps, min_samples=min_samples).fit_predict(X)
+    # A budget this small splits every pass into many blocks
+    np.testing.assert_array_equal(dbscan_blocks(X, eps, min_samples, budget=5_000), expected)
+
+
+def test_affordable_radius_respects_budget(X):
+    assert affordable_radius(X, 0.5, budget=len(X) ** 2) == pytest.approx(5.0)
+    radius = affordable_radius(X, 0.1, budget=len(X) * 20)
+    assert radius is not None and radius < 5.0
+    assert affordable_radius(X, 4.0, budget=len(X)) is None
+
+
+def test_engine_falls_back_to_blocks_past_memory(X):
+    # Too little memory for a graph or sklearn's neighborhoods
+    engine = DBSCANEngine(X, reuse_graph=True, memory_mb=0.001)
+    expected = DBSCAN(eps=1.2, min_samples=5).fit_predict(X)
+    np.testing.assert_array_equal(engine.labels(1.2, 5), expected)
+    assert engine.graph is None
+
+
+def test_sliders_stay_interactive_at_benchmark_scale():
+    # The benchmark's 1e5-row event export: 12.5k players, default features
+    df = pd.concat(events(100_000), ignore_index=True).set_axis(list(EVENT_COUNT_NAMES), axis=1)
+    matrix = EventMatrix(df)
+    X = matrix.scaled(matrix.default_features())
+    assert len(X) > 12_000
+    engine = DBSCANEngine(X)
+
+    for eps, min_samples in [(1.2, 5), (0.5, 5), (1.2, 3)]:
+        start = time.perf_counter()
+        expected = DBSCAN(eps=eps, min_samples=min_samples).fit_predict(X)
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        labels = engine.labels(eps, min_samples)
+        first = time.perf_counter() - start
+        np.testing.assert_array_equal(labels, expected)
+        assert first <= 1.5 * baseline + 0.25, (eps, min_samples, first, baseline)
+
+        # Moving a slider back is a cache hit
+        start = time.perf_counter()
+        engine.labels(eps, min_samples)
+        assert time.perf_counter() - start < 0.01
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from benchmarks.generators import events
+from data_loader import EVENT_COUNT_NAMES
+from player_features import EventMatrix
+
+
+@pytest.fixture(scope='module')
+def long_counts():
+    df = pd.concat(events(5_000), ignore_index=True).set_axis(list(EVENT_COUNT_NAMES), axis=1)
+    df['count'] = df['count'].astype('float64')
+    # Missing counts, and some players with nothing but missing counts
+    df.loc[df.index[::37], 'count'] = np.nan
+    only_missing = pd.DataFrame({'distinct_id': ['ghost'] * 2, 'event_type': ['died', 'looted'], 'count': [np.nan] * 2})
+    return pd.concat([df, only_missing], ignore_index=True).astype({'distinct_id': 'category', 'event_type': 'category'})
+
+
+@pytest.fixture(scope='module')
+def pivot(long_counts):
+    # The pivot 3d_player_types.py built before; repeated (player, event)
+    # rows are averaged
+    return long_counts.pivot_table(
+        index='distinct_id', columns='event_type', values='count', fill_value=0, observed=True
+    )
+
+
+def test_matrix_matches_pivot_table(long_counts, pivot):
+    matrix = EventMatrix(long_counts)
+    assert list(matrix.players) == list(pivot.index)
+    assert list(matrix.event_types) == list(pivot.columns)
+    np.testing.assert_allclose(matrix.columns(list(pivot.columns)), pivot.to_numpy())
+
+
+def test_scaled_matches_standard_scaler(long_counts, pivot):
+    features = ['weapon_used', 'syncs_extracted', 'building_placed']
+    expected = StandardScaler().fit_transform(pivot[features])
+    np.testing.assert_allclose(EventMatrix(long_counts).scaled(features), expected, rtol=1e-4, atol=1e-5)
+
+
+def test_group_means_match_groupby(long_counts, pivot):
+    features = ['died', 'looted']
+    labels = np.arange(len(pivot)) % 4
+    groups, sizes, means = EventMatrix(long_counts).group_means(labels, features)
+    expected = pivot[features].groupby(labels).mean()
+    np.testing.assert_array_equal(groups, expected.index)
+    np.testing.assert_array_equal(sizes, np.bincount(labels))
+    np.testing.assert_allclose(means, expected.to_numpy())
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rivalries import RivalryMatrix
+
+
+@pytest.fixture
+def interactions():
+    rng = np.random.default_rng(0)
+    # Few players so most pairs are mutual; self-kills included
+    return pd.DataFrame({
+        'distinct_id': rng.integers(0, 40, 3_000),
+        'target_player_id': rng.integers(0, 40, 3_000),
+    })
+
+
+def duel_table(interactions):
+    return interactions.groupby(['distinct_id', 'target_player_id']).size().reset_index(name='kills')
+
+
+def canonical(rivalries):
+    """Pairs as (min, max) with the kill counts oriented to match."""
+    swap = rivalries['Player A'] > rivalries['Player B']
+    out = rivalries.copy()
+    out.loc[swap, ['Player A', 'Player B']] = rivalries.loc[swap, ['Player B', 'Player A']].to_numpy()
+    out.loc[swap, ['A → B Kills', 'B → A Kills']] = rivalries.loc[swap, ['B → A Kills', 'A → B Kills']].to_numpy()
+    out['Net Score'] = out['A → B Kills'] - out['B → A Kills']
+    columns = ['Player A', 'Player B', 'A → B Kills', 'B → A Kills', 'Total Kills', 'Net Score']
+    return out[columns].astype('int64').sort_values(['Player A', 'Player B']).reset_index(drop=True)
+
+
+def test_rivalries_match_self_merge(interactions):
+    duels = duel_table(interactions)
+
+    # The self-merge plus sorted-pair dedup killsapp.py used before
+    rival_duels = pd.merge(
+        duels, duels,
+        left_on=['distinct_id', 'target_player_id'], right_on=['target_player_id', 'distinct_id'],
+        suffixes=('_from', '_to')
+    )
+    rival_duels['sorted_pair'] = rival_duels.apply(lambda row: tuple(sorted([row['distinct_id_from'], row['target_player_id_from']])), axis=1)
+    expected = rival_duels.drop_duplicates('sorted_pair').rename(columns={
+        'distinct_id_from': 'Player A',
+        'target_player_id_from': 'Player B',
+        'kills_from': 'A → B Kills',
+        'kills_to': 'B → A Kills',
+    })
+    expected['Total Kills'] = expected['A → B Kills'] + expected['B → A Kills']
+    expected['Net Score'] = expected['A → B Kills'] - expected['B → A Kills']
+
+    pd.testing.assert_frame_equal(canonical(RivalryMatrix(duels).rivalries()), canonical(expected))
+
+
+@pytest.mark.parametrize('player', [0, 7, 39])
+def test_player_views_match_value_counts(interactions, player):
+    matrix = RivalryMatrix(duel_table(interactions))
+
+    kills_summary = interactions.loc[interactions['distinct_id'] == player, 'target_player_id'].value_counts().reset_index()
+    kills_summary.columns = ['Target', 'Times Killed']
+    deaths_summary = interactions.loc[interactions['target_player_id'] == player, 'distinct_id'].value_counts().reset_index()
+    deaths_summary.columns = ['Attacker', 'Times Killed By']
+    expected = pd.merge(kills_summary, deaths_summary, left_on='Target', right_on='Attacker')
+    expected['Net Kills'] = expected['Times Killed'] - expected['Times Killed By']
+
+    def by(frame, key):
+        return frame.astype('int64').sort_values(key).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(by(matrix.kills_of(player), 'Target'), by(kills_summary, 'Target'))
+    pd.testing.assert_frame_equal(by(matrix.deaths_of(player), 'Attacker'), by(deaths_summary, 'Attacker'))
+    pd.testing.assert_frame_equal(
+        by(matrix.player_rivalries(player), 'Target'),
+        by(expected[['Target', 'Times Killed', 'Times Killed By', 'Net Kills']], 'Target'),
+    )